@@ -1,5 +1,12 @@
-import xtea, random, hashlib, crc
-from typing import Literal, Union, Optional
+import random, hashlib, struct, threading, functools
+import numpy as np
+from collections import OrderedDict
+from hmac import compare_digest
+from typing import Literal, Union, Optional, Callable, Iterable
+try:
+    import crc32c as _crc32c_accel  # optional SSE4.2 / ARMv8 backend
+except ImportError:
+    _crc32c_accel = None
 
 class HeaderV1:
     '''
@@ -20,6 +27,8 @@ class HeaderV1:
     PRIO_NORM			= 2
     PRIO_LOW			= 3
 
+    PRIO_NAMES = {'critical': 0, 'high': 1, 'norm': 2, 'low': 3}
+
     FLAG_HMAC = 8
     FLAG_XTEA = 4
     FLAG_RDP = 2
@@ -41,7 +50,7 @@ class HeaderV1:
         if isinstance(prio, int):
             assert 0 <= prio    <= 3 , 'priority must be 0..3'
         else:
-            prio = ['critical', 'high', 'norm', 'low'].index(prio)
+            prio = self.PRIO_NAMES[prio]
         assert 0 <= flags <= 0xff, 'flags must be 0x00..0xff'
             
         self.src = src
@@ -60,23 +69,59 @@ class HeaderV1:
         self.endian:Literal['little', 'big'] = endian
 
     @classmethod
-    def from_bytes(cls, b:bytes, endian:Literal['little', 'big']='big') -> 'CSP.HeaderV1':
+    def from_int(cls, h:int, endian:Literal['little', 'big']='big') -> 'HeaderV1':
+        '''
+        Build a header from a 32-bit header word.
+        Every field of a 32-bit word is in range, so __init__ validation is skipped.
+        '''
+        self = object.__new__(cls)
+        # extract in order from MSB
+        self.prio  = (h >> 30) & 0x3
+        self.src   = (h >> 25) & 0x1f
+        self.dst   = (h >> 20) & 0x1f
+        self.dport = (h >> 14) & 0x3f
+        self.sport = (h >> 8 ) & 0x3f
+        self.flags = h & 0xff
+        self.endian = endian
+        return self
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def cached(cls, h:int, endian:Literal['little', 'big']='big') -> 'HeaderV1':
+        '''
+        Shared header object for a recurring 32-bit header word.
+        The same instance is returned on every call, treat it as read-only.
+        '''
+        return cls.from_int(h, endian)
+
+    @classmethod
+    def from_bytes(cls, b:bytes, endian:Literal['little', 'big']='big') -> 'HeaderV1':
         '''
         Parse a 4-byte CSP header (V1)
         '''
         assert len(b) == 4, 'CSP Header V1 must have exactly 4 bytes'
-        h = int.from_bytes(b, byteorder=endian)
-        
-        # extract in order from MSB
-        prio  = (h >> 30) & 0x3
-        src   = (h >> 25) & 0x1f
-        dst   = (h >> 20) & 0x1f
-        dport = (h >> 14) & 0x3f
-        sport = (h >> 8 ) & 0x3f
-        flags = h & 0xff
-        
-        return cls(src, dst, dport, sport, 
-                   prio=prio, flags=flags, endian=endian)
+        return cls.from_int(int.from_bytes(b, byteorder=endian), endian)
+
+    @staticmethod
+    def decode_array(words:np.ndarray, endian:Literal['little', 'big']='big') -> dict[str, np.ndarray]:
+        '''
+        Columnar decode of many headers, e.g. from a capture.
+        words: integer array of 32-bit header words, or uint8 array of
+               4-byte headers as on the wire (shape (n, 4) or flat)
+        returns uint8 arrays keyed prio, src, dst, dport, sport, flags
+        '''
+        words = np.asarray(words)
+        if words.dtype == np.uint8:
+            words = np.ascontiguousarray(words).reshape(-1).view('>u4' if endian == 'big' else '<u4')
+        h = words.astype(np.uint32, copy=False)
+        return {
+            'prio':  ((h >> 30) & 0x3 ).astype(np.uint8),
+            'src':   ((h >> 25) & 0x1f).astype(np.uint8),
+            'dst':   ((h >> 20) & 0x1f).astype(np.uint8),
+            'dport': ((h >> 14) & 0x3f).astype(np.uint8),
+            'sport': ((h >> 8 ) & 0x3f).astype(np.uint8),
+            'flags': ( h        & 0xff).astype(np.uint8),
+        }
 
     def to_bytes(self) -> bytes:
         '''
@@ -91,6 +136,38 @@ class HeaderV1:
         value |=  self.flags
         return value.to_bytes(4, byteorder=self.endian)
 
+    # field -> (shift, width mask) in the 32-bit header word
+    FIELDS = {
+        'prio': (30, 0x3), 'src': (25, 0x1f), 'dst': (20, 0x1f),
+        'dport': (14, 0x3f), 'sport': (8, 0x3f), 'flags': (0, 0xff),
+    }
+
+    @classmethod
+    def match_mask(cls, **fields) -> tuple[int, int]:
+        '''
+        Compile field constraints into (mask, value) so that a 32-bit header
+        word h matches when h & mask == value.
+        fields: any of prio (int or name), src, dst, dport, sport, flags, and the
+                single flag bits hmac, xtea, rdp, crc given as booleans
+        '''
+        mask = value = 0
+        for name, v in fields.items():
+            if v is None:
+                continue
+            if name in ('hmac', 'xtea', 'rdp', 'crc'):
+                bit = getattr(cls, 'FLAG_' + name.upper())
+                mask |= bit
+                value = value | bit if v else value & ~bit
+                continue
+            assert name in cls.FIELDS, 'unknown header field %s' % name
+            if name == 'prio' and isinstance(v, str):
+                v = cls.PRIO_NAMES[v]
+            shift, width = cls.FIELDS[name]
+            assert 0 <= v <= width, '%s must be 0..%d' % (name, width)
+            mask |= width << shift
+            value = (value & ~(width << shift)) | (v << shift)
+        return mask, value
+
     @property
     def hmac(self):
         return bool(self.flags & self.FLAG_HMAC)
@@ -127,28 +204,78 @@ class HeaderV1:
         if value: self.flags |= self.FLAG_CRC
         else: self.flags &= ~self.FLAG_CRC
 
+def _crc32c_tables() -> tuple[tuple[int, ...], ...]:
+    '''
+    Build the slicing-by-8 lookup tables for reflected CRC-32C (poly 0x82f63b78)
+    '''
+    t0 = []
+    for i in range(256):
+        c = i
+        for _ in range(8):
+            c = (c >> 1) ^ 0x82f63b78 if c & 1 else c >> 1
+        t0.append(c)
+
+    tables = [t0]
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append([(c >> 8) ^ t0[c & 0xff] for c in prev])
+    return tuple(tuple(t) for t in tables)
+
+_CRC32C_TABLES = _crc32c_tables()
+
+def crc32c(data:Union[bytes, bytearray, memoryview], value:int=0) -> int:
+    '''
+    Pure-Python slicing-by-8 CRC-32C.
+    Pass the previous result as `value` to continue a running checksum.
+    '''
+    t0, t1, t2, t3, t4, t5, t6, t7 = _CRC32C_TABLES
+    mv = memoryview(data).cast('B')
+    n8 = len(mv) & ~7
+    c = value ^ 0xffffffff
+
+    for lo, hi in struct.iter_unpack('<II', mv[:n8]):
+        lo ^= c
+        c = (t7[lo & 0xff] ^ t6[(lo >> 8) & 0xff] ^ t5[(lo >> 16) & 0xff] ^ t4[lo >> 24] ^
+             t3[hi & 0xff] ^ t2[(hi >> 8) & 0xff] ^ t1[(hi >> 16) & 0xff] ^ t0[hi >> 24])
+
+    for b in mv[n8:]:
+        c = t0[(c ^ b) & 0xff] ^ (c >> 8)
+
+    return c ^ 0xffffffff
+
 class CRCEngine:
     '''
     CRC-32C (Castagnoli)
     Big endian is the standard implementation
+
+    Uses the `crc32c` package when installed, otherwise the pure-Python
+    slicing-by-8 implementation. A custom backend can be plugged in as any
+    callable `backend(data) -> int` returning the finalized CRC-32C.
     '''
-    def __init__(self, endian:Literal['big', 'little']='big'):
+    def __init__(self, endian:Literal['big', 'little']='big',
+                 backend:Optional[Callable[[Union[bytes, bytearray, memoryview]], int]]=None):
         self.endian = endian
-        self.engine = crc.Calculator(crc.Configuration(
-            width=32,
-            polynomial=0x1edc6f41,
-            init_value=0xffffffff,
-            final_xor_value=0xffffffff,
-            reverse_input=True,
-            reverse_output=True
-        ))
-
-    def __call__(self, x: bytes) -> bytes:
-        return self.engine.checksum(x).to_bytes(4, self.endian)
+        if backend is None:
+            backend = _crc32c_accel.crc32c if _crc32c_accel else crc32c
+        self.backend = backend
+
+    def checksum(self, x:Union[bytes, bytearray, memoryview]) -> int:
+        return self.backend(x)
+
+    def checksum_many(self, xs:Iterable[Union[bytes, bytearray, memoryview]]) -> list[bytes]:
+        '''
+        Compute the CRC of every buffer in `xs`, same output format as __call__
+        '''
+        backend, endian = self.backend, self.endian
+        return [backend(x).to_bytes(4, endian) for x in xs]
+
+    def __call__(self, x:Union[bytes, bytearray, memoryview]) -> bytes:
+        return self.backend(x).to_bytes(4, self.endian)
 
 class HMACEngine:
     BLOCKSIZE = 64
     DIGESTSIZE = 20
+    TAGSIZE = 4
 
     def __init__(self, key:bytes=b''):
         # Use SHA1 as KDF
@@ -159,48 +286,173 @@ class HMACEngine:
             rkey = hashlib.sha1(rkey).digest()
         rkey = rkey + b'\x00' * (self.BLOCKSIZE - len(rkey))
         
-        # Prepare inner and outer padded keys
-        self._ipad = bytes(b ^ 0x36 for b in rkey)
-        self._opad = bytes(b ^ 0x5C for b in rkey)
-
-    def __call__(self, data:Union[bytes, bytearray, memoryview]):
-        sha1 = hashlib.sha1()
-        sha1.update(self._ipad)
-        sha1.update(data)
-        inner_hash = sha1.digest()
+        # Pre-key the inner and outer hash states; they are copied per message
+        self._inner = hashlib.sha1(bytes(b ^ 0x36 for b in rkey))
+        self._outer = hashlib.sha1(bytes(b ^ 0x5C for b in rkey))
+
+    def __call__(self, data:Union[bytes, bytearray, memoryview]) -> bytes:
+        inner = self._inner.copy()
+        inner.update(data)
         
-        outer = hashlib.sha1()
-        outer.update(self._opad)
-        outer.update(inner_hash)
-        return outer.digest()[0:4]
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        return outer.digest()[0:self.TAGSIZE]
+
+    def verify(self, data:Union[bytes, bytearray, memoryview], tag:Union[bytes, bytearray, memoryview]) -> bool:
+        '''
+        Constant-time check of a 4-byte tag against data
+        '''
+        return compare_digest(self(data), tag)
+
+    def verify_many(self, frames:Iterable[Union[bytes, bytearray, memoryview]]) -> list[bool]:
+        '''
+        Verify frames that carry their tag in the last 4 bytes (as transmitted)
+        '''
+        inner0, outer0, t = self._inner, self._outer, self.TAGSIZE
+        results = []
+        append = results.append
+        for frame in frames:
+            if len(frame) < t:
+                append(False)
+                continue
+            inner = inner0.copy()
+            inner.update(frame[:-t])
+            outer = outer0.copy()
+            outer.update(inner.digest())
+            append(compare_digest(outer.digest()[:t], frame[-t:]))
+        return results
 
 class XTEAEngine:
-    def __init__(self, key:bytes=b'', legacy_unsafe:bool=False):
+    '''
+    XTEA in CTR mode, counter block = nonce (4B) + count (4B), both big endian.
+    The keystream for a message is computed in one NumPy pass over all blocks.
+    Engines hold no per-message state, so they can be shared between threads.
+    '''
+    DELTA = 0x9e3779b9
+    CYCLES = 32
+    VECTOR_MIN_BLOCKS = 16   # below this, per-block Python ints beat NumPy call overhead
+
+    def __init__(self, key:bytes=b'', legacy_unsafe:bool=False, cache_size:int=64):
         # Use SHA1 as KDF
         rkey = hashlib.sha1(key).digest()[0:16]
         self.legacy_unsafe = legacy_unsafe
+        self.cache_size = cache_size
 
-        def counter():
-            iv = self.nonce + self.count.to_bytes(4, 'big')
-            if self.firstrun:
-                self.firstrun = False
-            else:
-                self.count += 1
-                self.count &= 0xffffffff
-            return iv
+        # Per-round key schedule terms (sum + k[...]) for both half rounds
+        k = struct.unpack('>4L', rkey)
+        s, sched0, sched1 = 0, [], []
+        for _ in range(self.CYCLES):
+            sched0.append((s + k[s & 3]) & 0xffffffff)
+            s = (s + self.DELTA) & 0xffffffff
+            sched1.append((s + k[(s >> 11) & 3]) & 0xffffffff)
+        self._sched = tuple(zip(sched0, sched1))
+        self._sched_np = tuple(zip(np.array(sched0, dtype=np.uint32),
+                                   np.array(sched1, dtype=np.uint32)))
+
+        self._cache: OrderedDict[tuple[bytes, int], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _counts(self, nblocks:int) -> Iterable[int]:
+        # legacy counter does not advance after the first block: 1, 1, 2, 3, ...
+        if self.legacy_unsafe:
+            return [1] + list(range(1, nblocks)) if nblocks else []
+        return range(1, nblocks + 1)
+
+    def _blocks_scalar(self, nonce:bytes, nblocks:int) -> np.ndarray:
+        n0, out = int.from_bytes(nonce, 'big'), []
+        for count in self._counts(nblocks):
+            v0, v1 = n0, count & 0xffffffff
+            for k0, k1 in self._sched:
+                v0 = (v0 + ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ k0)) & 0xffffffff
+                v1 = (v1 + ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ k1)) & 0xffffffff
+            out.append(struct.pack('>2L', v0, v1))
+        return np.frombuffer(b''.join(out), dtype=np.uint8)
+
+    def _blocks(self, nonce:bytes, nblocks:int) -> np.ndarray:
+        if nblocks < self.VECTOR_MIN_BLOCKS:
+            return self._blocks_scalar(nonce, nblocks)
 
-        self.ciper = xtea.new(rkey, mode=xtea.MODE_CTR, counter=counter)
+        v0 = np.full(nblocks, int.from_bytes(nonce, 'big'), dtype=np.uint32)
+        v1 = np.arange(1, nblocks + 1, dtype=np.uint64).astype(np.uint32)
+        if self.legacy_unsafe:
+            v1[1:] -= 1   # same sequence as _counts
 
-    def encrypt(self, data:Union[bytes, bytearray, memoryview], nonce:bytes):
+        for k0, k1 in self._sched_np:
+            v0 += (((v1 << 4) ^ (v1 >> 5)) + v1) ^ k0
+            v1 += (((v0 << 4) ^ (v0 >> 5)) + v0) ^ k1
+
+        return np.stack((v0, v1), axis=1).astype('>u4').view(np.uint8).reshape(-1)
+
+    def keystream(self, nonce:bytes, length:int) -> np.ndarray:
+        '''
+        Return the keystream bytes for (nonce, length) as a read-only uint8 array.
+        Keystreams of recently used nonces are kept in a bounded LRU cache.
+        '''
         assert len(nonce) == 4, 'len(nonce) must be 4'
-        self.nonce = nonce
-        self.count = 1
-        self.firstrun = self.legacy_unsafe
-        return self.ciper.encrypt(data)
+        nonce = bytes(nonce)
+        nblocks = (length + 7) // 8
+        key = (nonce, nblocks)
+
+        with self._lock:
+            ks = self._cache.get(key)
+            if ks is not None:
+                self._cache.move_to_end(key)
+                return ks[:length]
 
-    def decrypt(self, data:Union[bytes, bytearray, memoryview], nonce:bytes):
+        ks = self._blocks(nonce, nblocks)
+        ks.flags.writeable = False
+
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = ks
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return ks[:length]
+
+    def encrypt(self, data:Union[bytes, bytearray, memoryview], nonce:bytes) -> bytes:
+        ks = self.keystream(nonce, len(data))
+        return (np.frombuffer(data, dtype=np.uint8) ^ ks).tobytes()
+
+    def decrypt(self, data:Union[bytes, bytearray, memoryview], nonce:bytes) -> bytes:
         return self.encrypt(data, nonce)
 
+class CodecProfile:
+    '''
+    Engines shared by every Packet using the same keys and options.
+    Building HMAC/XTEA/CRC engines is costly, so use CodecProfile.get()
+    to reuse one cached profile per (hmac_key, xtea_key, crc_endian, options).
+    '''
+    _profiles: dict[tuple, 'CodecProfile'] = {}
+
+    def __init__(self,
+                 hmac_key:Optional[bytes]=None,
+                 xtea_key:Optional[bytes]=None,
+                 crc_endian:Optional[Literal['big', 'little']]='big',
+                 crc_include_header:bool=False,
+                 xtea_legacy_unsafe:bool=False):
+        self.hmac_engine = None if hmac_key is None else HMACEngine(hmac_key)
+        self.xtea_engine = None if xtea_key is None else XTEAEngine(xtea_key, legacy_unsafe=xtea_legacy_unsafe)
+        self.crc_engine = None if crc_endian is None else CRCEngine(endian=crc_endian)
+        self.crc_include_header = crc_include_header
+
+    @classmethod
+    def get(cls,
+            hmac_key:Optional[bytes]=None,
+            xtea_key:Optional[bytes]=None,
+            crc_endian:Optional[Literal['big', 'little']]='big',
+            crc_include_header:bool=False,
+            xtea_legacy_unsafe:bool=False) -> 'CodecProfile':
+        '''
+        Return the shared profile for these settings, creating it on first use
+        '''
+        key = (None if hmac_key is None else bytes(hmac_key),
+               None if xtea_key is None else bytes(xtea_key),
+               crc_endian, crc_include_header, xtea_legacy_unsafe)
+        profile = cls._profiles.get(key)
+        if profile is None:
+            profile = cls._profiles[key] = cls(*key)
+        return profile
+
 class Packet:
     '''
     CSP packet
@@ -226,21 +478,30 @@ class Packet:
                  crc_include_header:bool=False,
                  crc_endian:Optional[Literal['big', 'little']]='big',
                  xtea_legacy_unsafe:bool=False,
-                 exception:bool=False
+                 exception:bool=False,
+                 profile:Optional[CodecProfile]=None
                 ):
         '''
         set hmac_key=None, xtea_key=None, crc_endian=None for transparent mode
+        a profile, when given, replaces hmac_key, xtea_key, crc_endian,
+        crc_include_header and xtea_legacy_unsafe
         '''
+        if profile is None:
+            profile = CodecProfile.get(hmac_key, xtea_key, crc_endian,
+                                       crc_include_header, xtea_legacy_unsafe)
+        self.profile = profile
         self.header = HeaderV1(src, dst, dport, sport, 
                                prio=prio, flags=flags, endian=header_endian,
-                               hmac=(hmac_key != None), xtea=(xtea_key != None),
+                               hmac=(profile.hmac_engine != None), xtea=(profile.xtea_engine != None),
                                rdp=rdp, crc=crc)
-        self.hmac_engine = None if hmac_key is None else HMACEngine(hmac_key)
-        self.xtea_engine = None if xtea_key is None else XTEAEngine(xtea_key, legacy_unsafe=xtea_legacy_unsafe)
-        self.crc_engine = None if crc_endian is None else CRCEngine(endian=crc_endian)
-        self.crc_include_header = crc_include_header
+        self.hmac_engine = profile.hmac_engine
+        self.xtea_engine = profile.xtea_engine
+        self.crc_engine = profile.crc_engine
+        self.crc_include_header = profile.crc_include_header
         self.exception = exception
         self.payload = payload
+        self.raw = b''
+        self.rs_corrections = 0   # set by the link layer on decode
     
     def __str__(self):
         xtea_en = self.header.xtea and self.xtea_engine
@@ -254,7 +515,7 @@ class Packet:
 
     def encode(self) -> bytes:
         header = self.header.to_bytes()
-        payload = self.payload
+        payload = bytes(self.payload)
         
         if self.header.hmac and self.hmac_engine:
             payload += self.hmac_engine(payload)
@@ -271,7 +532,14 @@ class Packet:
         
         return header + payload
 
-    def decode(self, data:bytes):
+    def decode(self, data:Union[bytes, bytearray, memoryview]):
+        '''
+        data may be bytes, bytearray or a memoryview; payload and raw are always
+        bytes. On success self.raw holds the received header + payload (trailers stripped).
+        '''
+        self.raw = b''
+        # at AX100 frame sizes one copy up front allocates less than slicing views
+        data = bytes(data)
         self.header = HeaderV1.from_bytes(data[0:4], self.header.endian)
         self.payload = data[4:]
         
@@ -309,9 +577,14 @@ class Packet:
                 if self.exception: raise ValueError('packet too short')
                 return
 
-            if hmac_val != self.hmac_engine(self.payload[:-4]):
+            if not self.hmac_engine.verify(self.payload[:-4], hmac_val):
                 self.payload = b''
                 if self.exception: raise ValueError('HMAC ERROR')
                 return
                     
             self.payload = self.payload[:-4]
+
+        if self.header.xtea and self.xtea_engine:
+            self.raw = data[0:4] + self.payload
+        else:
+            self.raw = data[:4 + len(self.payload)]
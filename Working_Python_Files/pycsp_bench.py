@@ -0,0 +1,666 @@
+'''
+Micro-benchmarks for the pycsp / pycsplink codecs
+
+usage: python pycsp_bench.py [name ...]    (no name runs everything)
+'''
+import hashlib
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import reed_solomon_ccsds as rs
+
+import pycsp as csp
+import pycsplink as csplink
+import pycsp_wire as wire
+
+BENCHMARKS = {}
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__.removeprefix('bench_')] = fn
+    return fn
+
+def _timeit(fn, *args, min_time=0.2) -> float:
+    '''
+    Return the mean seconds per call of fn(*args), run for at least min_time
+    '''
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn(*args)
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            return dt / n
+        n *= 2
+
+def _report(name:str, seconds:float, nbytes:int=0, baseline:float=0.0):
+    line = '  %-28s %10.2f us/call' % (name, seconds * 1e6)
+    if nbytes:
+        line += '  %8.2f MB/s' % (nbytes / seconds / 1e6)
+    if baseline:
+        line += '  x%.1f' % (baseline / seconds)
+    print(line)
+
+# --- CRC-32C ------------------------------------------------------------------
+
+@benchmark
+def bench_crc():
+    try:
+        import crc
+    except ImportError:
+        crc = None
+
+    frames = [os.urandom(n) for n in (28, 83, 204, 4096)]
+    engine = csp.CRCEngine()
+    table = csp.CRCEngine(backend=csp.crc32c)
+
+    for data in frames:
+        print('CRC-32C %d B' % len(data))
+        baseline = 0.0
+        if crc:
+            calc = crc.Calculator(crc.Configuration(
+                width=32,
+                polynomial=0x1edc6f41,
+                init_value=0xffffffff,
+                final_xor_value=0xffffffff,
+                reverse_input=True,
+                reverse_output=True
+            ))
+            baseline = _timeit(calc.checksum, data)
+            _report('crc.Calculator', baseline, len(data))
+        _report('slicing-by-8', _timeit(table, data), len(data), baseline)
+        if engine.backend is not csp.crc32c:
+            _report('accelerated', _timeit(engine, data), len(data), baseline)
+
+    batch = [os.urandom(204) for _ in range(256)]
+    print('CRC-32C checksum_many 256 x 204 B')
+    _report('checksum_many', _timeit(engine.checksum_many, batch), 256 * 204)
+
+# --- Golay24 ------------------------------------------------------------------
+
+@benchmark
+def bench_golay():
+    golay = csplink.Golay24
+    t0 = time.perf_counter()
+    golay.build_tables()
+    print('Golay24 table build %.1f ms' % ((time.perf_counter() - t0) * 1e3))
+
+    words = list(range(0, 4096, 17))
+    clean = [golay.encode(r) for r in words]
+    noisy = [c ^ 0x800401 for c in clean]   # 3 bit errors
+
+    def run(fn, xs):
+        for x in xs:
+            fn(x)
+
+    print('Golay24 encode')
+    baseline = _timeit(run, golay.encode_loop, words) / len(words)
+    _report('loop', baseline)
+    _report('table', _timeit(run, golay.encode, words) / len(words), baseline=baseline)
+
+    for name, xs in (('clean', clean), ('3 bit errors', noisy)):
+        print('Golay24 decode, %s' % name)
+        baseline = _timeit(run, golay.decode_loop, xs) / len(xs)
+        _report('loop', baseline)
+        _report('table', _timeit(run, golay.decode, xs) / len(xs), baseline=baseline)
+
+# --- CCSDS scrambler ----------------------------------------------------------
+
+def _scramble_loop(data, skip=0):
+    # per-byte reference implementation the scrambler replaced
+    tbl = csplink.CCSDSRxScrambler._TABLE
+    tlen = len(tbl)
+    out = bytearray(len(data))
+    for i in range(skip, len(data)):
+        out[i] = data[i] ^ tbl[(i - skip) % tlen]
+    return out
+
+@benchmark
+def bench_scrambler():
+    scrambler = csplink.CCSDSRxScrambler()
+    for n in (32, 255, 1024, 4095):
+        data = os.urandom(n)
+        buf = bytearray(data)
+        print('CCSDS scrambler %d B' % n)
+        baseline = _timeit(_scramble_loop, data)
+        _report('per-byte loop', baseline, n)
+        _report('big-int XOR', _timeit(scrambler, data), n, baseline)
+        _report('big-int XOR in place', _timeit(scrambler, buf, True), n, baseline)
+
+# --- HMAC ---------------------------------------------------------------------
+
+class _HMACPerCall(csp.HMACEngine):
+    # per-call implementation HMACEngine replaced: re-hashes ipad/opad every message
+    def __init__(self, key:bytes=b''):
+        rkey = hashlib.sha1(key).digest()[0:16]
+        rkey = rkey + b'\x00' * (self.BLOCKSIZE - len(rkey))
+        self._ipad = bytes(b ^ 0x36 for b in rkey)
+        self._opad = bytes(b ^ 0x5C for b in rkey)
+
+    def __call__(self, data):
+        sha1 = hashlib.sha1()
+        sha1.update(self._ipad)
+        sha1.update(data)
+        outer = hashlib.sha1()
+        outer.update(self._opad)
+        outer.update(sha1.digest())
+        return outer.digest()[0:4]
+
+@benchmark
+def bench_hmac():
+    key = os.urandom(32)
+    engine = csp.HMACEngine(key)
+    reference = _HMACPerCall(key)
+
+    for n in (28, 204):
+        data = os.urandom(n)
+        print('HMAC-SHA1 %d B' % n)
+        baseline = _timeit(reference, data)
+        _report('per-call ipad/opad', baseline, n)
+        _report('pre-keyed states', _timeit(engine, data), n, baseline)
+
+    frames = [d + engine(d) for d in (os.urandom(204) for _ in range(256))]
+    print('HMAC-SHA1 audit 256 x 208 B frames')
+    baseline = _timeit(lambda: [f[-4:] == reference(f[:-4]) for f in frames])
+    _report('per-call slice + compare', baseline, 256 * 208)
+    _report('verify_many', _timeit(engine.verify_many, frames), 256 * 208, baseline)
+
+# --- XTEA-CTR -----------------------------------------------------------------
+
+@benchmark
+def bench_xtea():
+    try:
+        import xtea
+    except ImportError:
+        xtea = None
+
+    key = os.urandom(16)
+    rkey = hashlib.sha1(key).digest()[0:16]
+    nonce = os.urandom(4)
+
+    def xtea_package(data):
+        # per-block counter closure driving the xtea package, as XTEAEngine used to
+        count = [1]
+        def counter():
+            iv = nonce + count[0].to_bytes(4, 'big')
+            count[0] += 1
+            return iv
+        return xtea.new(rkey, mode=xtea.MODE_CTR, counter=counter).encrypt(data)
+
+    for n in (28, 204, 4096):
+        data = os.urandom(n)
+        print('XTEA-CTR %d B' % n)
+        baseline = 0.0
+        if xtea:
+            baseline = _timeit(xtea_package, data)
+            _report('xtea package', baseline, n)
+        cold = csp.XTEAEngine(key, cache_size=0)
+        _report('numpy keystream', _timeit(cold.encrypt, data, nonce), n, baseline)
+        warm = csp.XTEAEngine(key)
+        _report('numpy keystream, cached', _timeit(warm.encrypt, data, nonce), n, baseline)
+
+# --- CSP header parsing -------------------------------------------------------
+
+def _header_validating(b, endian='big'):
+    # from_bytes before the fast path: field extraction, then a validating __init__
+    h = int.from_bytes(b, byteorder=endian)
+    return csp.HeaderV1((h >> 25) & 0x1f, (h >> 20) & 0x1f, (h >> 14) & 0x3f, (h >> 8) & 0x3f,
+                        prio=(h >> 30) & 0x3, flags=h & 0xff, endian=endian)
+
+@benchmark
+def bench_header():
+    # a capture-like mix: few distinct headers recurring many times
+    words = np.random.default_rng(0).choice(
+        np.array([0x9411d001, 0x82a28a00, 0xc2a28a00, 0x8a1c4008], dtype='>u4'), 4096)
+    raw = words.tobytes()
+    headers = [raw[i:i + 4] for i in range(0, len(raw), 4)]
+
+    def run(fn):
+        for b in headers:
+            fn(b)
+
+    print('CSP header parse, per header')
+    baseline = _timeit(run, _header_validating) / len(headers)
+    _report('validating __init__', baseline)
+    _report('from_bytes', _timeit(run, csp.HeaderV1.from_bytes) / len(headers), baseline=baseline)
+    _report('cached', _timeit(run, lambda b: csp.HeaderV1.cached(int.from_bytes(b, 'big'))) / len(headers),
+            baseline=baseline)
+    flat = np.frombuffer(raw, dtype=np.uint8)
+    _report('decode_array', _timeit(csp.HeaderV1.decode_array, flat) / len(headers), baseline=baseline)
+
+# --- Reed-Solomon -------------------------------------------------------------
+
+def _rs_decode_padded(codeword):
+    # previous AX100.decode path: always left-pad to 255 and run a full decode
+    padding = 255 - len(codeword)
+    errs, decoded = rs.decode(bytes(padding) + codeword, False, 1)
+    return errs[0], decoded[padding:]
+
+def _rs_encode_padded(data):
+    padding = 223 - len(data)
+    return rs.encode(bytes(padding) + data, False, 1)[padding:]
+
+@benchmark
+def bench_rs():
+    codec = csplink.ReedSolomon
+    codec.build_tables()
+
+    for n in (28, 204):
+        data = os.urandom(n)
+        clean = codec.encode(data)
+        noisy = bytearray(clean)
+        for i in (3, n // 2, n + 5):
+            noisy[i] ^= 0x5a
+        noisy = bytes(noisy)
+
+        print('RS(255,223) encode %d B' % n)
+        baseline = _timeit(_rs_encode_padded, data)
+        _report('padded rs.encode', baseline, n)
+        _report('shortened table encode', _timeit(codec.encode, data), n, baseline)
+
+        for name, codeword in (('clean', clean), ('3 byte errors', noisy)):
+            print('RS(255,223) decode %d B, %s' % (n, name))
+            baseline = _timeit(_rs_decode_padded, codeword)
+            _report('padded rs.decode', baseline, n)
+            _report('syndrome check + fallback', _timeit(codec.decode, codeword), n, baseline)
+
+# --- AX100 deframer -----------------------------------------------------------
+
+@benchmark
+def bench_deframer():
+    link = csplink.LinkProfile(os.urandom(32), verbose=False)
+    frames = [link.uplink.encode(csp.Packet(10, 1, 7, 16, payload=os.urandom(n % 200)))
+              for n in range(1000)]
+    stream = b''.join(frames)
+    # TCP-like reads: coalesced and split frames
+    chunks = [stream[i:i + 1400] for i in range(0, len(stream), 1400)]
+
+    def run(asm_errors):
+        deframer = csplink.AX100Deframer(asm_errors=asm_errors)
+        n = 0
+        for chunk in chunks:
+            n += len(deframer.push(chunk))
+        assert n == len(frames)
+
+    for asm_errors in (0, 2):
+        t = _timeit(run, asm_errors)
+        print('AX100 deframer, ASM errors <= %d: %8.0f frames/s  %6.2f MB/s'
+              % (asm_errors, len(frames) / t, len(stream) / t / 1e6))
+
+# --- Codec stage event-loop latency -------------------------------------------
+
+@benchmark
+def bench_codec_loop():
+    import asyncio
+
+    link = csplink.LinkProfile(os.urandom(32), verbose=False)
+    crc = csp.CRCEngine()
+    burst = 200
+    down, up = [], []
+    for n in range(burst):
+        raw = csp.Packet(1, 10, 7, 16, payload=os.urandom(64 + n % 128)).encode()
+        down.append(raw + crc(raw))
+        up.append(link.uplink.body(csp.Packet(10, 1, 16, 7, payload=os.urandom(n % 180))))
+
+    async def frames():
+        for rx in down:
+            yield rx
+
+    async def run(codec):
+        # a 1 ms ticker stands in for client accept/read handling
+        lags = []
+        stop = asyncio.Event()
+        async def ticker():
+            loop = asyncio.get_running_loop()
+            while not stop.is_set():
+                t = loop.time()
+                await asyncio.sleep(0.001)
+                lags.append(loop.time() - t - 0.001)
+        tick = asyncio.create_task(ticker())
+        await asyncio.sleep(0.01)
+
+        t0 = time.perf_counter()
+        encoded = asyncio.gather(*(codec.encode(body) for body in up))
+        n = 0
+        async for resp in codec.decode_ordered(frames()):
+            assert resp is not None
+            n += 1
+        assert n == burst and len(await encoded) == burst
+        dt = time.perf_counter() - t0
+
+        stop.set()
+        await tick
+        return dt, max(lags), sum(lags) / len(lags)
+
+    print('Burst of %d downlink decodes + %d RS uplink encodes' % (burst, burst))
+    for kind in (None, 'thread', 'process'):
+        codec = csplink.CodecPool(link, kind, workers=2)
+        try:
+            asyncio.run(run(codec))   # warm up workers and tables
+            dt, worst, mean = asyncio.run(run(codec))
+        finally:
+            codec.close()
+        print('  %-10s %8.1f ms total  loop lag max %7.2f ms  mean %6.3f ms'
+              % (kind or 'inline', dt * 1e3, worst * 1e3, mean * 1e3))
+
+# --- Gateway wire format -----------------------------------------------------
+
+@benchmark
+def bench_wire():
+    import asyncio
+    import struct
+
+    count, batch = 20000, 64
+    packets = [csp.Packet(1, 10, 7, 16, payload=os.urandom(16 + n % 96)).encode() for n in range(count)]
+
+    async def read_exactly(reader):
+        n = 0
+        while n < count:
+            _, length = struct.unpack('<II', await reader.readexactly(8))
+            await reader.readexactly(length)
+            n += 1
+
+    async def read_buffered(reader):
+        frames = wire.FrameReader()
+        n = 0
+        while n < count:
+            n += len(await frames.read(reader))
+
+    async def write_single(writer):
+        for p in packets:
+            writer.write(wire.frame(p))
+            await writer.drain()
+
+    async def write_lines(writer, batched):
+        for i in range(0, count, batch):
+            writer.writelines(wire.frame_parts(packets[i:i + batch], batched))
+            await writer.drain()
+
+    async def run(read, write):
+        done = asyncio.get_running_loop().create_future()
+        async def handle(reader, writer):
+            await read(reader)
+            done.set_result(None)
+            writer.close()
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        _, writer = await asyncio.open_connection('127.0.0.1', port)
+        t0 = time.perf_counter()
+        await write(writer)
+        await done
+        dt = time.perf_counter() - t0
+        writer.close()
+        server.close()
+        return dt
+
+    async def negotiate():
+        # an empty BATCH frame alone must switch the peer to batching
+        reader = asyncio.StreamReader()
+        reader.feed_data(wire.batch([]))
+        reader.feed_eof()
+        frames = wire.FrameReader()
+        assert await frames.read(reader) == [] and frames.batched
+
+    asyncio.run(negotiate())
+    print('Gateway wire format over loopback, %d packets' % count)
+    cases = [
+        ('write + readexactly x2',          read_exactly,  write_single),
+        ('writelines + FrameReader',        read_buffered, lambda w: write_lines(w, False)),
+        ('BATCH writelines + FrameReader',  read_buffered, lambda w: write_lines(w, True)),
+    ]
+    for name, read, write in cases:
+        dt = min(asyncio.run(run(read, write)) for _ in range(3))
+        print('  %-32s %10.0f packets/s' % (name, count / dt))
+
+# --- Downlink journal ---------------------------------------------------------
+
+@benchmark
+def bench_journal():
+    import tempfile
+    from pycsp_journal import Journal
+
+    frames = [os.urandom(40 + n % 160) for n in range(2000)]
+
+    def run(group):
+        with tempfile.TemporaryDirectory() as d:
+            journal = Journal(os.path.join(d, 'j'))
+            t0 = time.perf_counter()
+            for f in frames:
+                journal.append(f)
+                if len(journal.pending) >= group:
+                    journal.commit()
+            journal.commit()
+            dt = time.perf_counter() - t0
+            t1 = time.perf_counter()
+            seq = 0
+            while records := journal.read(seq, 256):
+                seq = records[-1][0] + 1
+            assert seq == len(frames)
+            rt = time.perf_counter() - t1
+            journal.close()
+        return dt, rt
+
+    print('Downlink journal, %d frames' % len(frames))
+    for group in (1, 16, 64):
+        dt, rt = min(run(group) for _ in range(3))
+        print('  commit every %-3d frames     %8.2f us/frame append  %6.2f us/frame replay'
+              % (group, dt / len(frames) * 1e6, rt / len(frames) * 1e6))
+
+# --- Shared-memory ring -------------------------------------------------------
+
+@benchmark
+def bench_ring():
+    from pycsp_ring import RingWriter, RingReader
+
+    frames = [csp.Packet(1, 10, 7, 16, payload=os.urandom(16 + n % 96)).encode() for n in range(20000)]
+    writer = RingWriter('pycsp_bench_ring', 1 << 22)
+    readers = [RingReader('pycsp_bench_ring') for _ in range(4)]
+    try:
+        t0 = time.perf_counter()
+        for f in frames:
+            writer.write(f)
+        wt = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for r in readers:
+            n = 0
+            while got := r.read():
+                n += len(got)
+            assert n == len(frames) and r.lost == 0
+        rt = (time.perf_counter() - t0) / len(readers)
+    finally:
+        for r in readers:
+            r.close()
+        writer.close()
+
+    print('Shared-memory ring, %d frames' % len(frames))
+    print('  %-28s %10.0f frames/s' % ('writer', len(frames) / wt))
+    print('  %-28s %10.0f frames/s' % ('each of %d readers' % len(readers), len(frames) / rt))
+
+# --- RX frame loss ------------------------------------------------------------
+
+@benchmark
+def bench_rx_loss():
+    import asyncio
+    import socket
+    import threading
+
+    link = csplink.LinkProfile(os.urandom(32), verbose=False)
+    crc = csp.CRCEngine()
+    bursts, burst_len, spacing, pause = 50, 8, 0.0005, 0.05   # multi-packet responses
+    count = bursts * burst_len
+    raw = csp.Packet(1, 10, 7, 16, payload=os.urandom(60)).encode()
+    frame = raw + crc(raw)
+
+    async def fake_grc(client):
+        # like GNU Radio socket_pdu: a PDU reaches only the clients connected when it is sent
+        writers = set()
+        async def handle(reader, writer):
+            writers.add(writer)
+            try:
+                await reader.read()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                writers.discard(writer)
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        got = client(port)
+        await asyncio.sleep(0.2)
+        for _ in range(bursts):
+            for _ in range(burst_len):
+                for w in list(writers):
+                    w.write(frame)
+                await asyncio.sleep(spacing)
+            await asyncio.sleep(pause)
+        await asyncio.sleep(0.2)
+        server.close()
+        return await got()
+
+    def reconnect_loop(port):
+        # the old pycsp_rx loop: new connection for every recv()
+        stop = threading.Event()
+        received = [0]
+        def run():
+            while not stop.is_set():
+                s = socket.create_connection(('127.0.0.1', port))
+                s.settimeout(1)
+                try:
+                    if link.downlink.decode(s.recv(1024)):
+                        received[0] += 1
+                except TimeoutError:
+                    pass
+                s.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        async def result():
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            return received[0]
+        return result
+
+    def persistent(port):
+        received = [0]
+        def sink(packet):
+            received[0] += 1
+        receiver = csplink.GrcReceiver([sink], decode=link.downlink.decode, port=port)
+        task = asyncio.create_task(receiver.run())
+        async def result():
+            task.cancel()
+            return received[0]
+        return result
+
+    print('RX frame loss, %d bursts of %d frames from a fake GNU Radio server' % (bursts, burst_len))
+    for name, client in (('reconnect per frame', reconnect_loop), ('GrcReceiver', persistent)):
+        received = asyncio.run(fake_grc(client))
+        print('  %-28s received %4d  lost %4d (%.1f%%)'
+              % (name, received, count - received, (count - received) / count * 100))
+
+# --- MPI log archive ----------------------------------------------------------
+
+@benchmark
+def bench_mpi():
+    import glob
+    import re
+    import tempfile
+    import pycsp_mpi
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    logs = sorted(glob.glob(os.path.join(here, '..', 'Ground_Station', '01 Router', 'MPI packets', 'mpi_*.txt')))
+    if not logs:
+        print('MPI log archive: no logs found')
+        return
+    down = re.compile(r'AX100 Down \[ANT(\d+)\] \((\d+)B, hex\): (.*)')
+
+    def per_line():
+        # one bytes.fromhex() and one header object per frame
+        rows = []
+        for path in logs:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if m := down.match(line):
+                        frame = bytes.fromhex(m.group(3))
+                        rows.append((frame, csp.HeaderV1.from_bytes(frame[:4])))
+        return rows
+
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, 'mpi.npz')
+        n = pycsp_mpi.convert(logs, out)
+        print('MPI log archive, %d logs, %d frames' % (len(logs), n))
+        baseline = _timeit(per_line)
+        _report('per-line parse', baseline)
+        _report('convert to archive', _timeit(pycsp_mpi.convert, logs, out), baseline=baseline)
+        _report('load archive', _timeit(pycsp_mpi.load, out), baseline=baseline)
+        archive = pycsp_mpi.load(out)
+
+    def per_record(data):
+        # struct unpack of each record found by bytes.find, stamps not removed
+        out, pos = [], data.find(pycsp_mpi.MPI_SYNC)
+        while 0 <= pos <= len(data) - 152:
+            out.extend(struct.unpack_from('>65H', data, pos + 20))
+            pos = data.find(pycsp_mpi.MPI_SYNC, pos + 152)
+        return out
+
+    bulk = list(pycsp_mpi.bulk_files(archive).values())
+    files = [d.tobytes() for d, _ in bulk]
+    n = sum(len(pycsp_mpi.decode_samples(*f)['samples']) for f in bulk)
+    print('MPI samples, %d files, %d samples' % (len(files), n))
+    baseline = _timeit(lambda: [per_record(d) for d in files])
+    _report('per-record struct', baseline)
+    _report('decode_samples', _timeit(lambda: [pycsp_mpi.decode_samples(*f) for f in bulk]), baseline=baseline)
+    _report('bulk_files (reassembly)', _timeit(pycsp_mpi.bulk_files, archive))
+
+# --- Decode allocations -------------------------------------------------------
+
+def _peak_alloc(fn, *args) -> int:
+    '''
+    Return the peak bytes allocated by one call of fn(*args) above the starting level
+    '''
+    fn(*args)   # warm up caches
+    tracemalloc.start()
+    try:
+        best = None
+        for _ in range(5):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            best = peak - start if best is None else min(best, peak - start)
+    finally:
+        tracemalloc.stop()
+    return best
+
+@benchmark
+def bench_decode_alloc():
+    link = csplink.LinkProfile(os.urandom(32), verbose=False)
+    crc = csp.CRCEngine()
+
+    for n in (28, 204, 2048):
+        print('Peak allocation per decoded frame, %d B payload' % n)
+        packet = csp.Packet(1, 10, 7, 16, payload=os.urandom(n))
+        raw = packet.encode()
+        down = raw + crc(raw)
+        up = link.uplink.encode(packet)[link.uplink.prefill:-link.uplink.tailfill]
+
+        def copy_decode(data):
+            csp.Packet().decode(bytes(data))
+
+        def view_decode(data):
+            csp.Packet().decode(memoryview(data))
+
+        print('  %-28s %10d B' % ('Packet.decode(bytes)', _peak_alloc(copy_decode, raw)))
+        print('  %-28s %10d B' % ('Packet.decode(memoryview)', _peak_alloc(view_decode, raw)))
+        print('  %-28s %10d B' % ('downlink AX100.decode', _peak_alloc(link.downlink.decode, down)))
+        if n <= 200:
+            print('  %-28s %10d B' % ('uplink AX100.decode (RS)', _peak_alloc(link.uplink.decode, up)))
+
+# --- Main ---------------------------------------------------------------------
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1,8 +1,12 @@
 import asyncio
-import struct
+import time
+from collections import OrderedDict, deque
 
 import pycsp as csp
 import pycsplink as csplink
+import pycsp_wire as wire
+from pycsp_journal import Journal
+from pycsp_ring import RingWriter
 
 # --- Node addresses -----------------------------------------------------------
 
@@ -29,137 +33,655 @@ HOST         = '127.0.0.1'
 PORT_OBC     = 53001   # raw OBC payload wire format
 PORT_CSP_TCP = 53002   # CSP-over-TCP (full CSP packets with headers)
 
-# --- Radio link setup ---------------------------------------------------------
+CLIENT_QUEUE_SIZE = 256            # frames buffered per client before overflow
+CLIENT_OVERFLOW   = 'drop-oldest'  # 'drop-oldest' | 'drop-newest' | 'disconnect'
+CLIENT_BATCH_MAX  = 64             # packets per write (and per BATCH frame)
 
-with open('hmac_key.txt', 'r') as f:
-    hmac_key = bytes.fromhex(f.read().strip())
+RADIOS = [
+    # name,  GRC socket port, baud rate
+    ('b210', 52001, 9600),    # radio_ax100.py
+    ('icom', 52002, 2400),    # radio_ax100_icom.py
+]
+RADIO_HOST    = '127.0.0.1'
+RADIO_BACKOFF = (1.0, 30.0) # reconnect delay, doubled per failed attempt up to the maximum
+UPLINK_POLICY = 'primary'   # 'primary' | 'last-heard' | 'all'
+DEDUP_WINDOW  = 1.0         # seconds in which the same frame from another radio is a duplicate
 
-uplink   = csplink.AX100(hmac_key=hmac_key, crc=False, reed_solomon=True,
-                         randomize=True, len_field=True, syncword=True,
-                         prefill=32, tailfill=1)
-downlink = csplink.AX100(hmac_key=None, crc=True, reed_solomon=False,
-                         randomize=False, len_field=False, syncword=False,
-                         exception=False, verbose=True)
+UPLINK_GAP     = 0.05   # extra seconds between frames for TX/RX turnaround
+STATS_INTERVAL = 60     # seconds between uplink statistics printouts
 
-# --- Wire format helpers ------------------------------------------------------
+CODEC_EXECUTOR = None   # None (codec on the event loop) | 'thread' | 'process'
+CODEC_WORKERS  = 2
 
-def _frame(data: bytes) -> bytes:
-    return struct.pack('<II', 0, len(data)) + data
+JOURNAL_PATH            = 'downlink_journal'  # .dat/.idx files; None disables the journal
+JOURNAL_COMMIT_INTERVAL = 0.5     # seconds between group commits
+JOURNAL_GROUP           = 64      # commit early once this many frames are queued
+JOURNAL_FSYNC           = False   # fsync after each commit (off the event loop)
 
-async def _read_frame(reader: asyncio.StreamReader) -> bytes:
-    hdr = await reader.readexactly(8)
-    _, length = struct.unpack('<II', hdr)
-    return await reader.readexactly(length)
+RING_NAME = None       # shared-memory ring for same-host readers, e.g. 'pycsp_downlink'; None disables
+RING_SIZE = 1 << 22    # bytes
 
-# --- Connected client sets ----------------------------------------------------
+TXN_PORTS   = range(32, 64)   # ephemeral CSP source ports for transactions
+TXN_TIMEOUT = 5.0             # seconds to wait for a reply once the request is on air
 
-_obc_clients: set[asyncio.StreamWriter] = set()
-_csp_clients: set[asyncio.StreamWriter] = set()
+ECHO_TTL   = 10.0   # seconds a transmitted frame is expected back as an echo
+ECHO_GRACE = 60.0   # further seconds a match still counts, as a late echo
 
-async def _broadcast_obc(payload: bytes):
-    frame = _frame(payload)
-    for w in list(_obc_clients):
-        try:
-            w.write(frame)
-            await w.drain()
-        except Exception:
-            _obc_clients.discard(w)
-
-async def _broadcast_csp(csp_pkt: bytes):
-    frame = _frame(csp_pkt)
-    for w in list(_csp_clients):
+# --- Radio link setup ---------------------------------------------------------
+
+link     = csplink.LinkProfile.from_key_file('hmac_key.txt')
+uplink   = link.uplink
+downlink = link.downlink
+# pycsp_tx still transmits straight to GRC; its echoes are recognized by their uplink HMAC
+echoes   = csplink.EchoFilter(ECHO_TTL, ECHO_GRACE, hmac_engine=uplink.hmac_engine)
+
+class _Radio:
+    """
+    One GNU Radio flowgraph. run() keeps it connected and feeds every received
+    frame, tagged with the radio, into the shared RX queue.
+    """
+    def __init__(self, name: str, port: int, baud: int):
+        self.name = name
+        self.port = port
+        self.baud = baud
+        self.receiver = csplink.GrcReceiver([self._received], addr=RADIO_HOST, port=port, backoff=RADIO_BACKOFF)
+        self.rx: asyncio.Queue | None = None
+        self.received = 0
+        self.kept = 0          # frames for which this radio had the best copy
+        self.last_kept = 0.0
+        self.sent = 0
+
+    @property
+    def link(self) -> csplink.GrcLink | None:
+        return self.receiver.link
+
+    def _received(self, data: bytes):
+        self.received += 1
+        return self.rx.put((self, data))
+
+    async def run(self, rx: asyncio.Queue):
+        self.rx = rx
+        await self.receiver.run()
+
+radios = [_Radio(*r) for r in RADIOS]
+
+def _uplink_radios() -> list[_Radio]:
+    """Connected radios to transmit on, chosen by UPLINK_POLICY."""
+    up = [r for r in radios if r.link]
+    if not up or UPLINK_POLICY == 'all':
+        return up
+    if UPLINK_POLICY == 'last-heard':
+        # the radio that most recently delivered a frame first, see _Dedup
+        return [max(up, key=lambda r: r.last_kept)]
+    return up[:1]   # primary: first connected radio in RADIOS order
+
+class _Dedup:
+    """
+    Drops copies of a downlink frame heard by several receivers within
+    `window` seconds, keyed by a hash of the decoded frame. Decoded copies
+    are identical, so the first one is forwarded at once; the radio whose
+    copy needed the fewest RS corrections is credited with the frame.
+    The downlink profile has reed_solomon=False (the flowgraph corrects
+    before the socket), so corrections are always 0 there and the first
+    radio to deliver a frame keeps the credit.
+    A radio cannot duplicate itself: the same frame again from a radio that
+    already delivered it is a genuine repeat (e.g. back-to-back identical
+    replies) and is forwarded as a new frame.
+    """
+    def __init__(self, window: float = DEDUP_WINDOW):
+        self.window = window
+        self.seen: OrderedDict[bytes, list] = OrderedDict()   # hash -> [time, radio, corrections, radios heard]
+        self.duplicates = 0
+
+    def first(self, raw: bytes, radio: _Radio, corrections: int) -> bool:
+        now = time.monotonic()
+        while self.seen:
+            fp, entry = next(iter(self.seen.items()))
+            if entry[0] >= now - self.window:
+                break
+            del self.seen[fp]
+
+        fp = csplink.EchoFilter.fingerprint(raw)
+        entry = self.seen.get(fp)
+        if entry is None or radio in entry[3]:
+            self.seen[fp] = [now, radio, corrections, {radio}]
+            self.seen.move_to_end(fp)
+            radio.kept += 1
+            radio.last_kept = now
+            return True
+
+        self.duplicates += 1
+        entry[3].add(radio)
+        if corrections < entry[2]:
+            entry[1].kept -= 1
+            radio.kept += 1
+            radio.last_kept = now
+            entry[1], entry[2] = radio, corrections
+        return False
+
+dedup = _Dedup()
+
+# --- Connected clients --------------------------------------------------------
+
+class _Client:
+    """
+    Downlink side of one TCP client: a bounded send queue drained by its own
+    writer task, so a slow client never delays the RX worker or other clients.
+    The writer takes every queued packet (up to CLIENT_BATCH_MAX) per write.
+    """
+    def __init__(self, writer: asyncio.StreamWriter, header: bool = True,
+                 maxsize: int = CLIENT_QUEUE_SIZE, overflow: str = CLIENT_OVERFLOW):
+        assert overflow in ('drop-oldest', 'drop-newest', 'disconnect'), 'unknown overflow policy'
+        self.writer = writer
+        self.peer = writer.get_extra_info('peername')
+        self.header = header          # forward the CSP header, or the payload only
+        self.default_filter = True    # replaced by the client's first subscription
+        self.filters: list[tuple[int, int]] = []   # compiled (mask, value) subscriptions
+        self.batched = False          # client negotiated BATCH frames
+        self.live = True              # False while a journal replay is feeding the queue
+        self.replay: asyncio.Task | None = None
+        self.queries: set[asyncio.Task] = set()   # QUERY requests in flight
+        self.overflow = overflow
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize)   # packet contents, unframed
+        self.sent = 0
+        self.dropped = 0
+        self.max_lag = 0     # deepest the queue has been, in frames
+        self.task = asyncio.create_task(self._writer_task())
+
+    @property
+    def lag(self) -> int:
+        return self.queue.qsize()
+
+    def put(self, data: bytes):
+        """Queue a packet without blocking, applying the overflow policy when full."""
+        if self.queue.full():
+            if self.overflow == 'disconnect':
+                self.close()
+                return
+            self.dropped += 1
+            if self.overflow == 'drop-newest':
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(data)
+        self.max_lag = max(self.max_lag, self.queue.qsize())
+
+    async def put_wait(self, data: bytes):
+        """Queue a packet, waiting for room instead of dropping (journal replay)."""
+        await self.queue.put(data)
+
+    def write_frame(self, frame: bytes):
+        """Write a complete non-packet frame (QUERY reply), bypassing the queue."""
+        self.writer.write(frame)
+
+    async def _writer_task(self):
         try:
-            w.write(frame)
-            await w.drain()
-        except Exception:
-            _csp_clients.discard(w)
+            while True:
+                packets = [await self.queue.get()]
+                while len(packets) < CLIENT_BATCH_MAX and not self.queue.empty():
+                    packets.append(self.queue.get_nowait())
+                self.writer.writelines(wire.frame_parts(packets, self.batched))
+                await self.writer.drain()
+                self.sent += len(packets)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.writer.close()
+
+    def close(self):
+        self.task.cancel()
+        if self.replay:
+            self.replay.cancel()
+        for task in self.queries:
+            task.cancel()
+        if self.dropped:
+            print(f'client {self.peer}: sent {self.sent}, dropped {self.dropped}, max lag {self.max_lag}')
+
+# --- Subscriptions ------------------------------------------------------------
+
+def _parse_filter(text: str) -> dict:
+    """Parse b'src=1 dport=16 prio=high crc=1' style filters (space or comma separated)."""
+    fields = {}
+    for item in text.replace(',', ' ').split():
+        name, _, v = item.partition('=')
+        assert name in csp.HeaderV1.FIELDS or name in ('hmac', 'xtea', 'rdp', 'crc'), \
+            'unknown header field %s' % name
+        fields[name] = v if name == 'prio' and not v.isdigit() else int(v, 0)
+    return fields
+
+class _Subscriptions:
+    """
+    Downlink dispatch. Each filter is compiled to (mask, value) on the 32-bit
+    CSP header word and filed under its dport, or under any_dport when it does
+    not constrain the port, so a frame is only tested against the filters that
+    can match it.
+    """
+    def __init__(self):
+        self.by_dport: list[list[tuple[int, int, _Client]]] = [[] for _ in range(64)]
+        self.any_dport: list[tuple[int, int, _Client]] = []
+
+    def add(self, client: _Client, **fields):
+        mask, value = csp.HeaderV1.match_mask(**fields)
+        dport_shift, dport_width = csp.HeaderV1.FIELDS['dport']
+        if (mask >> dport_shift) & dport_width == dport_width:
+            self.by_dport[(value >> dport_shift) & dport_width].append((mask, value, client))
+        else:
+            self.any_dport.append((mask, value, client))
+        client.filters.append((mask, value))
+
+    def remove(self, client: _Client):
+        for entries in self.by_dport + [self.any_dport]:
+            entries[:] = [e for e in entries if e[2] is not client]
+        client.filters.clear()
+
+    @staticmethod
+    def matches(client: _Client, word: int) -> bool:
+        return any(word & mask == value for mask, value in client.filters)
+
+    def dispatch(self, raw: bytes):
+        word = int.from_bytes(raw[0:4], 'big')
+        payload = None
+        delivered = set()
+        for entries in (self.by_dport[(word >> 14) & 0x3f], self.any_dport):
+            for mask, value, client in entries:
+                if word & mask != value or client in delivered:
+                    continue
+                delivered.add(client)
+                if client.task.done() or not client.live:
+                    continue
+                if client.header:
+                    client.put(raw)
+                else:
+                    payload = payload or raw[4:]
+                    client.put(payload)
+
+subscriptions = _Subscriptions()
+
+def _subscribe(client: _Client, text: str):
+    if client.default_filter:
+        subscriptions.remove(client)
+        client.default_filter = False
+    subscriptions.add(client, **_parse_filter(text))
+
+# --- Uplink scheduler ---------------------------------------------------------
+
+class _UplinkScheduler:
+    """
+    Single owner of the radio uplink. Packets wait in one queue per CSP priority
+    (critical first); within a priority, clients are served round-robin. After
+    each frame the scheduler waits for its on-air time on the slowest radio used,
+    so the priority order holds at the radio instead of piling up in GNU Radio's buffer.
+    """
+    def __init__(self, gap: float = UPLINK_GAP):
+        self.gap = gap
+        # per priority: client -> deque of (packet, enqueue time, future)
+        self.queues: list[OrderedDict] = [OrderedDict() for _ in range(4)]
+        self.wakeup = asyncio.Event()
+        self.sent = [0] * 4
+        self.wait_total = [0.0] * 4
+        self.wait_max = [0.0] * 4
+        self.airtime = 0.0
+
+    def submit(self, packet: bytes | csp.Packet, client=None) -> asyncio.Future:
+        """Queue a CSP packet; the returned future completes once it is on air."""
+        if isinstance(packet, csp.Packet):
+            prio = packet.header.prio
+        else:
+            prio = packet[0] >> 6 if packet else csp.HeaderV1.PRIO_NORM
+        fut = asyncio.get_running_loop().create_future()
+        self.queues[prio].setdefault(client, deque()).append((packet, time.monotonic(), fut))
+        self.wakeup.set()
+        return fut
+
+    def depth(self) -> list[int]:
+        return [sum(len(q) for q in clients.values()) for clients in self.queues]
+
+    def _next(self):
+        for prio, clients in enumerate(self.queues):
+            if clients:
+                client, q = next(iter(clients.items()))
+                item = q.popleft()
+                if q:
+                    clients.move_to_end(client)
+                else:
+                    del clients[client]
+                return prio, item
+        return None
+
+    async def run(self):
+        while True:
+            nxt = self._next()
+            if nxt is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            prio, (packet, queued, fut) = nxt
+            targets = _uplink_radios()
+            try:
+                if not targets:
+                    raise ConnectionError('no radio connected')
+                body = uplink.body(packet)
+                echoes.add(body)
+                frame = await codec.encode(body)
+                for radio in targets:
+                    await radio.link.send(frame)
+                    radio.sent += 1
+            except Exception as e:
+                if not fut.done(): fut.set_exception(e)
+                continue
+
+            wait = time.monotonic() - queued
+            self.sent[prio] += 1
+            self.wait_total[prio] += wait
+            self.wait_max[prio] = max(self.wait_max[prio], wait)
+            if not fut.done(): fut.set_result(None)
+
+            # encoded frame already carries prefill, ASM, Golay, RS parity and tailfill
+            airtime = len(frame) * 8 / min(r.baud for r in targets)
+            self.airtime += airtime
+            await asyncio.sleep(airtime + self.gap)
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth(),
+            'sent': list(self.sent),
+            'wait_avg': [t / n if n else 0.0 for t, n in zip(self.wait_total, self.sent)],
+            'wait_max': list(self.wait_max),
+            'airtime': self.airtime,
+        }
+
+scheduler: _UplinkScheduler
+codec: csplink.CodecPool
 
 # --- Uplink helpers -----------------------------------------------------------
 
-async def obc_send(payload: bytes, dst: int = OBC_ADDR):
-    """Wrap raw payload in a CSP packet addressed to dst and transmit."""
+async def obc_send(payload: bytes, dst: int = OBC_ADDR, client=None) -> asyncio.Future:
+    """Wrap raw payload in a CSP packet addressed to dst and queue it for transmission."""
     packet = csp.Packet(GCS_ADDR, dst, 7, 16, prio='norm', hmac_key=None, crc=False)
     packet.payload = payload
-    await ttc.send(uplink.encode(packet))  # type: ignore[name-defined]
-
-async def csp_send(csp_pkt: bytes):
-    """Transmit a pre-formed CSP packet (header + payload) through the radio."""
-    await ttc.send(uplink.encode(csp_pkt))  # type: ignore[name-defined]
+    return scheduler.submit(packet, client)
+
+async def csp_send(csp_pkt: bytes, client=None) -> asyncio.Future:
+    """Queue a pre-formed CSP packet (header + payload) for transmission through the radio."""
+    return scheduler.submit(csp_pkt, client)
+
+# --- Transactions -------------------------------------------------------------
+
+class _Transactions:
+    """
+    Request/response matching. Each request gets a source port that is free
+    for its destination node; the reply comes back from that node to that port,
+    so (src, dport) of a received packet identifies the waiting request.
+    Ports are reused in FIFO order, which keeps a late reply to a timed out
+    request from being taken for the answer to a newer one.
+    """
+    def __init__(self, ports: range = TXN_PORTS):
+        self.ports = ports
+        self.free: dict[int, asyncio.Queue[int]] = {}
+        self.pending: dict[tuple[int, int], asyncio.Future] = {}
+        self.completed = 0
+        self.timeouts = 0
+        self.unmatched = 0   # replies arriving after their request timed out
+
+    def _free_ports(self, node: int) -> asyncio.Queue[int]:
+        q = self.free.get(node)
+        if q is None:
+            q = self.free[node] = asyncio.Queue()
+            for port in self.ports:
+                q.put_nowait(port)
+        return q
+
+    async def query(self, dst: int, dport: int, payload: bytes = b'', timeout: float = TXN_TIMEOUT,
+                    prio: int | str = 'norm', crc: bool = False, client=None) -> bytes:
+        """
+        Send payload to (dst, dport) and return the reply (CSP header + payload).
+        Waits for a free source port when all are in flight; raises
+        asyncio.TimeoutError when no reply arrives within timeout of transmission.
+        """
+        ports = self._free_ports(dst)
+        sport = await ports.get()
+        key = (dst, sport)
+        reply = asyncio.get_running_loop().create_future()
+        self.pending[key] = reply
+        try:
+            packet = csp.Packet(GCS_ADDR, dst, dport, sport, prio=prio, hmac_key=None, crc=crc)
+            packet.payload = payload
+            await scheduler.submit(packet, client)
+            try:
+                raw = await asyncio.wait_for(reply, timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            self.completed += 1
+            return raw
+        finally:
+            del self.pending[key]
+            ports.put_nowait(sport)
+
+    def match(self, header: csp.HeaderV1, raw: bytes) -> bool:
+        """Hand a received packet to the request waiting for it, if any."""
+        if header.dst != GCS_ADDR or header.dport not in self.ports:
+            return False
+        reply = self.pending.get((header.src, header.dport))
+        if reply is None:
+            self.unmatched += 1
+            return False
+        if not reply.done():
+            reply.set_result(raw)
+        return True
+
+transactions = _Transactions()
+
+async def query(dst: int, dport: int, payload: bytes = b'', timeout: float = TXN_TIMEOUT, **kw) -> bytes:
+    """Send a request to a node and await its reply; see _Transactions.query."""
+    return await transactions.query(dst, dport, payload, timeout, **kw)
 
 # --- Client handlers ----------------------------------------------------------
 
-async def _handle_obc_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-    _obc_clients.add(writer)
+# --- Journal ------------------------------------------------------------------
+
+journal: Journal | None = None
+ring: RingWriter | None = None
+
+async def _journal_worker():
+    while True:
+        await asyncio.sleep(JOURNAL_COMMIT_INTERVAL)
+        if journal.commit() and JOURNAL_FSYNC:
+            await asyncio.to_thread(journal.sync)
+
+def _replay_start(text: str) -> int:
+    """Parse b'seq=120' or b'time=1700000000.5' (unix time) into a journal sequence number."""
+    name, _, v = text.strip().partition('=')
+    if name == 'seq':
+        seq = int(v)
+        if seq < 0:
+            raise ValueError('negative sequence number')
+        return min(seq, journal.next_seq)
+    assert name == 'time', 'replay from seq=N or time=T'
+    return journal.seq_at(float(v))
+
+async def _replay(client: _Client, seq: int):
+    """
+    Send journaled frames from seq that match the client's filters, then
+    switch the client back to live dispatch. Frames decoded meanwhile are
+    journaled too, so the switch happens only once the journal has nothing
+    newer, with no await in between: nothing is missed or sent twice.
+    """
+    client.live = False
     try:
-        while True:
-            payload = await _read_frame(reader)
-            await obc_send(payload)
-    except (asyncio.IncompleteReadError, ConnectionResetError):
-        pass
+        while records := journal.read(seq, CLIENT_BATCH_MAX):
+            for seq, _, raw in records:
+                if subscriptions.matches(client, int.from_bytes(raw[0:4], 'big')):
+                    await client.put_wait(raw if client.header else raw[4:])
+            seq += 1
     finally:
-        _obc_clients.discard(writer)
-        writer.close()
+        client.live = True
+        client.replay = None
 
-async def _handle_csp_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-    _csp_clients.add(writer)
+async def _serve_query(client: _Client, data: bytes):
+    """Run a client's QUERY request and send it the reply frame."""
+    try:
+        qid, dst, dport, prio, crc, timeout, payload = wire.parse_query(data)
+    except ValueError as e:
+        print(f'client {client.peer}: {e}')
+        return
+    try:
+        raw = await transactions.query(dst, dport, payload, timeout, prio=prio, crc=crc, client=client)
+        reply = wire.query_reply(qid, wire.QUERY_OK, raw)
+    except asyncio.TimeoutError:
+        reply = wire.query_reply(qid, wire.QUERY_TIMEOUT)
+    except (AssertionError, ConnectionError) as e:
+        reply = wire.query_reply(qid, wire.QUERY_ERROR, str(e).encode())
+    client.write_frame(reply)
+
+def _uplink_done(fut: asyncio.Future, peer):
+    # clients do not wait for their uplinks; report the ones that were dropped
+    if not fut.cancelled() and fut.exception() is not None:
+        print(f'client {peer}: uplink dropped: {fut.exception()}')
+
+async def _handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         header: bool, default_filter: dict, send):
+    client = _Client(writer, header)
+    subscriptions.add(client, **default_filter)
+    frames = wire.FrameReader()
     try:
         while True:
-            csp_pkt = await _read_frame(reader)
-            await csp_send(csp_pkt)
+            for kind, data in await frames.read(reader):
+                if kind == wire.SUBSCRIBE:
+                    try:
+                        _subscribe(client, data.decode('ascii'))
+                    except (AssertionError, ValueError, KeyError) as e:
+                        print(f'client {client.peer}: bad filter {data!r}: {e}')
+                elif kind == wire.REPLAY:
+                    if journal is None or client.replay:
+                        continue
+                    try:
+                        seq = _replay_start(data.decode('ascii'))
+                    except (AssertionError, ValueError) as e:
+                        print(f'client {client.peer}: bad replay request {data!r}: {e}')
+                        continue
+                    client.replay = asyncio.create_task(_replay(client, seq))
+                elif kind == wire.QUERY:
+                    task = asyncio.create_task(_serve_query(client, data))
+                    client.queries.add(task)
+                    task.add_done_callback(client.queries.discard)
+                else:
+                    fut = await send(data, client=client)
+                    fut.add_done_callback(lambda f, peer=client.peer: _uplink_done(f, peer))
+            client.batched = frames.batched
     except (asyncio.IncompleteReadError, ConnectionResetError):
         pass
+    except ValueError as e:
+        print(f'client {client.peer}: {e}')
     finally:
-        _csp_clients.discard(writer)
-        writer.close()
+        subscriptions.remove(client)
+        client.close()
 
-# --- RX worker ----------------------------------------------------------------
+async def _handle_obc_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # default: OBC->GCS frames, payload only
+    await _handle_client(reader, writer, False, {'src': OBC_ADDR, 'dst': GCS_ADDR}, obc_send)
 
-async def _rx_worker(link: csplink.GrcLink):
-    while True:
-        try:
-            rx = await asyncio.wait_for(link.recv(), timeout=1.0)
+async def _handle_csp_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # default: all decoded frames with full CSP header
+    await _handle_client(reader, writer, True, {}, csp_send)
 
-            if csp.HeaderV1.from_bytes(rx[0:4]).src == GCS_ADDR:  # echo - discard
-                continue
+# --- RX worker ----------------------------------------------------------------
 
-            resp = downlink.decode(rx)
+async def _rx_frames(rx: asyncio.Queue, order: deque):
+    while True:
+        radio, data = await rx.get()
+        if echoes.is_echo(data):  # our own transmission - discard
+            continue
+        order.append(radio)
+        yield data
+
+async def _rx_worker(rx: asyncio.Queue):
+    order: deque[_Radio] = deque()   # radio of each frame in the codec, results come back in order
+    try:
+        async for resp in codec.decode_ordered(_rx_frames(rx, order)):
+            radio = order.popleft()
             if not resp:
                 continue
+            raw, corrections = resp
+            if not dedup.first(raw, radio, corrections):
+                continue
+            try:
+                header = csp.HeaderV1.cached(int.from_bytes(raw[0:4], 'big'))
+                transactions.match(header, raw)
+                if journal:
+                    journal.append(raw)
+                    if len(journal.pending) >= JOURNAL_GROUP:
+                        journal.commit()
+                if ring:
+                    ring.write(raw)
+                subscriptions.dispatch(raw)
+            except Exception as e:
+                # one bad frame or a full disk must not stop RX for everyone
+                print(f'rx: frame from {radio.name} not delivered: {e!r}')
+
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
 
-            # Port 53001: OBC->GCS frames, payload only
-            if resp.header.src == OBC_ADDR and resp.header.dst == GCS_ADDR:
-                await _broadcast_obc(resp.payload)
-
-            # Port 53002: all decoded frames with full CSP header
-            raw_csp = resp.header.to_bytes() + resp.payload
-            await _broadcast_csp(raw_csp)
+# --- Statistics ---------------------------------------------------------------
 
-        except asyncio.TimeoutError:
-            pass
-        except (KeyboardInterrupt, asyncio.CancelledError):
-            break
-        except ValueError as e:
-            print(e)
+async def _stats_worker():
+    last = None
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        st = scheduler.stats()
+        if st['sent'] == last:
+            continue
+        last = st['sent']
+        print('uplink sent %s depth %s wait avg %s max %s airtime %.1fs' % (
+            st['sent'], st['depth'],
+            ['%.2f' % w for w in st['wait_avg']], ['%.2f' % w for w in st['wait_max']],
+            st['airtime']))
+        print('echoes suppressed %d (late %d), tracking %d' % (echoes.suppressed, echoes.late, len(echoes)))
+        for r in radios:
+            print('radio %s %s: received %d, kept %d, sent %d' % (
+                r.name, 'up' if r.link else 'down', r.received, r.kept, r.sent))
+        print('duplicates dropped %d' % dedup.duplicates)
 
 # --- Main ---------------------------------------------------------------------
 
 async def main():
-    global ttc
-    ttc = await csplink.GrcLink.connect()
-    _ = asyncio.create_task(_rx_worker(ttc))
+    global scheduler, codec, journal, ring
+    codec = csplink.CodecPool(link, CODEC_EXECUTOR, CODEC_WORKERS)
+    scheduler = _UplinkScheduler()
+    rx: asyncio.Queue = asyncio.Queue()
+    for radio in radios:
+        _ = asyncio.create_task(radio.run(rx))
+    _ = asyncio.create_task(_rx_worker(rx))
+    _ = asyncio.create_task(scheduler.run())
+    _ = asyncio.create_task(_stats_worker())
+    if JOURNAL_PATH:
+        journal = Journal(JOURNAL_PATH)
+        _ = asyncio.create_task(_journal_worker())
+    if RING_NAME:
+        ring = RingWriter(RING_NAME, RING_SIZE)
 
     obc_server = await asyncio.start_server(_handle_obc_client, HOST, PORT_OBC)
     csp_server = await asyncio.start_server(_handle_csp_client, HOST, PORT_CSP_TCP)
 
     print('Gateway started')
+    for r in radios:
+        print(f'  radio {r.name:6s}{RADIO_HOST}:{r.port}   ({r.baud} baud)')
     print(f'  OBC TCP     {HOST}:{PORT_OBC}   (raw OBC payload, no CSP header)')
     print(f'  CSP TCP     {HOST}:{PORT_CSP_TCP}   (full CSP packets with headers)')
+    if ring:
+        print(f'  ring        shared memory {RING_NAME!r}   (decoded frames with CSP header)')
 
-    async with obc_server, csp_server:
-        await asyncio.gather(
-            obc_server.serve_forever(),
-            csp_server.serve_forever(),
-        )
+    try:
+        async with obc_server, csp_server:
+            await asyncio.gather(
+                obc_server.serve_forever(),
+                csp_server.serve_forever(),
+            )
+    finally:
+        if journal:
+            journal.close()
+        if ring:
+            ring.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -0,0 +1,166 @@
+'''
+Append-only journal of decoded downlink frames
+
+Two files per journal:
+
+  <path>.dat  records: seq (uint64), unix time (double), length (uint32), frame
+  <path>.idx  16-byte header (magic, record count) followed by one
+              (offset in .dat, unix time) entry per record; memory-mapped
+
+append() only queues a record in memory and returns its sequence number;
+commit() writes every queued record with a single write and then publishes
+them in the index (group commit). Records are read back by sequence number
+or looked up by time from the index without scanning the data file.
+'''
+import mmap
+import os
+import struct
+import time
+from typing import Optional, Union
+
+import numpy as np
+
+_REC = struct.Struct('<QdI')
+_IDX_HDR = struct.Struct('<8sQ')
+_IDX_ENTRY = struct.Struct('<Qd')
+_IDX_DTYPE = np.dtype([('offset', '<u8'), ('time', '<f8')])
+_MAGIC = b'CSPJIDX1'
+
+class Journal:
+    def __init__(self, path:str, capacity:int=1 << 16):
+        '''
+        path: file name without extension; the journal is created if missing
+        and opened for appending if it exists. Records written after the last
+        commit of a previous run are discarded.
+        '''
+        self.path = path
+        self.data = open(path + '.dat', 'a+b')
+        self.idx = open(path + '.idx', 'a+b')
+        self.pending:list[tuple[float, bytes]] = []
+
+        self.idx.seek(0, os.SEEK_END)
+        if self.idx.tell() < _IDX_HDR.size:
+            self.idx.truncate(0)
+            self.idx.write(_IDX_HDR.pack(_MAGIC, 0))
+            self.idx.flush()
+        self._map(max(capacity, self._capacity()))
+
+        magic, self.count = _IDX_HDR.unpack_from(self.mm, 0)
+        assert magic == _MAGIC, 'not a journal index: %s.idx' % path
+        self.end = self._record_end(self.count - 1) if self.count else 0
+        self.data.truncate(self.end)
+
+    def _capacity(self) -> int:
+        self.idx.seek(0, os.SEEK_END)
+        return (self.idx.tell() - _IDX_HDR.size) // _IDX_ENTRY.size
+
+    def _map(self, capacity:int):
+        size = _IDX_HDR.size + capacity * _IDX_ENTRY.size
+        self.idx.seek(0, os.SEEK_END)
+        if self.idx.tell() < size:
+            self.idx.truncate(size)
+        self.mm = mmap.mmap(self.idx.fileno(), size)
+        self.capacity = capacity
+
+    def _grow(self, need:int):
+        capacity = self.capacity
+        while capacity < need:
+            capacity *= 2
+        self.mm.close()
+        self._map(capacity)
+
+    def _entry(self, seq:int) -> tuple[int, float]:
+        return _IDX_ENTRY.unpack_from(self.mm, _IDX_HDR.size + seq * _IDX_ENTRY.size)
+
+    def _record_end(self, seq:int) -> int:
+        offset, _ = self._entry(seq)
+        _, _, length = _REC.unpack(os.pread(self.data.fileno(), _REC.size, offset))
+        return offset + _REC.size + length
+
+    @property
+    def next_seq(self) -> int:
+        return self.count + len(self.pending)
+
+    def append(self, frame:Union[bytes, memoryview], timestamp:Optional[float]=None) -> int:
+        '''
+        Queue a frame for the next commit and return its sequence number
+        '''
+        self.pending.append((time.time() if timestamp is None else timestamp, bytes(frame)))
+        return self.next_seq - 1
+
+    def commit(self) -> int:
+        '''
+        Write all queued records and publish them in the index; returns the number written
+        '''
+        pending, self.pending = self.pending, []
+        if not pending:
+            return 0
+        if self.count + len(pending) > self.capacity:
+            self._grow(self.count + len(pending))
+
+        parts = []
+        offset, seq = self.end, self.count
+        base = _IDX_HDR.size + seq * _IDX_ENTRY.size
+        for i, (t, frame) in enumerate(pending):
+            parts.append(_REC.pack(seq + i, t, len(frame)))
+            parts.append(frame)
+            _IDX_ENTRY.pack_into(self.mm, base + i * _IDX_ENTRY.size, offset, t)
+            offset += _REC.size + len(frame)
+
+        self.data.seek(0, os.SEEK_END)
+        self.data.write(b''.join(parts))
+        self.data.flush()
+        # index entries are in place; bumping the count makes them visible
+        self.end = offset
+        self.count += len(pending)
+        _IDX_HDR.pack_into(self.mm, 0, _MAGIC, self.count)
+        return len(pending)
+
+    def sync(self):
+        '''
+        Force committed records to disk (fsync), for callers that need durability
+        '''
+        os.fsync(self.data.fileno())
+        self.mm.flush()
+
+    def seq_at(self, timestamp:float) -> int:
+        '''
+        Sequence number of the first record at or after timestamp
+        '''
+        times = np.frombuffer(self.mm, _IDX_DTYPE, self.count, _IDX_HDR.size)['time']
+        seq = int(np.searchsorted(times, timestamp, side='left'))
+        del times   # release the buffer so the map can be resized
+        if seq == self.count:
+            seq += sum(1 for t, _ in self.pending if t < timestamp)
+        return seq
+
+    def read(self, seq:int, max_count:int=256) -> list[tuple[int, float, bytes]]:
+        '''
+        Up to max_count records (seq, unix time, frame) starting at seq,
+        including records not committed yet
+        '''
+        assert seq >= 0, 'negative sequence number'
+        out = []
+        stop = min(seq + max_count, self.count)
+        if seq < stop:
+            first, _ = self._entry(seq)
+            last = self._record_end(stop - 1)
+            buf = os.pread(self.data.fileno(), last - first, first)
+            pos = 0
+            while pos < len(buf):
+                s, t, length = _REC.unpack_from(buf, pos)
+                pos += _REC.size
+                out.append((s, t, buf[pos:pos + length]))
+                pos += length
+            seq = stop
+
+        for i in range(seq - self.count, min(len(self.pending), seq - self.count + max_count - len(out))):
+            t, frame = self.pending[i]
+            out.append((self.count + i, t, frame))
+        return out
+
+    def close(self):
+        self.commit()
+        self.mm.close()
+        self.idx.close()
+        self.data.close()
@@ -0,0 +1,249 @@
+'''
+MPI packet logs to a columnar archive
+
+The ground station logs of MPI bulk downlinks (Ground_Station/01 Router/MPI
+packets/mpi_*.txt) hold every received frame as an
+`AX100 Down [ANT2] (204B, hex): C2 A2 ...` line, followed by a raw line and
+interleaved with JSON and status text. convert() streams any number of logs
+into one uncompressed .npz archive with a row per frame:
+
+  frames   (n, width) uint8   frame bytes, CSP header first, zero padded
+  length   (n,) uint16        frame length
+  antenna  (n,) uint8         antenna number from [ANTx]
+  log      (n,) uint16        index into logs
+  line     (n,) uint32        line number in that log (1-based)
+  prio, src, dst, dport, sport, flags   (n,) uint8 CSP header fields
+  logs     (k,) str           log file names
+
+Frames are decoded in fixed-width blocks: the hex text of a whole block goes
+through one bytes.fromhex() call and is scattered into the block with a mask.
+
+Bulk file chunks (payload type 0x10) carry a 7-byte header: type, sequence
+and chunk count (low bytes only), then the uint32 LE offset in the file.
+bulk_files() reassembles every downlinked file of an archive, and
+decode_samples() turns one into time-stamped MPI samples. An MPI file is a
+stream of 152-byte binary records, interleaved with JSON stamps such as
+{"mpi_start":1,"uptime_ms":...,"timestamp_ms":...} roughly every 20 kB:
+
+  sync     0c ff ff 0c
+  index    uint16 BE     record counter
+  header   14 bytes
+  samples  65 x uint16 BE
+  tail     2 bytes
+
+usage: python pycsp_mpi.py archive.npz mpi_*.txt
+'''
+import json
+import os
+import re
+import sys
+from typing import BinaryIO, Iterable, Optional, Union
+
+import numpy as np
+
+import pycsp as csp
+
+FRAME_WIDTH = 256
+BLOCK_ROWS = 4096
+
+BULK_TYPE = 0x10
+BULK_HEADER = 7     # type, seq, count, uint32 LE offset
+
+MPI_SYNC = b'\x0c\xff\xff\x0c'
+MPI_RECORD = np.dtype([
+    ('sync', '>u4'), ('index', '>u2'), ('header', 'u1', 14),
+    ('samples', '>u2', 65), ('tail', 'u1', 2),
+])
+
+_DOWN = re.compile(r'AX100 Down \[ANT(\d+)\] \(\d+B, hex\): ')
+
+class _Block:
+    def __init__(self):
+        self.hex:list[str] = []
+        self.length:list[int] = []
+        self.antenna:list[int] = []
+        self.line:list[int] = []
+
+    def __len__(self):
+        return len(self.length)
+
+    def frames(self, width:int) -> np.ndarray:
+        flat = np.frombuffer(bytes.fromhex(''.join(self.hex)), dtype=np.uint8)
+        length = np.array(self.length, dtype=np.intp)
+        assert flat.size == length.sum(), 'hex decode size mismatch'
+        block = np.zeros((len(length), width), dtype=np.uint8)
+        block[np.arange(width) < length[:, None]] = flat
+        return block
+
+def parse(lines:Iterable[str], width:int=FRAME_WIDTH, block_rows:int=BLOCK_ROWS):
+    '''
+    Stream the frames of one log as columns, yielding one dict of arrays
+    (frames, length, antenna, line) per block of up to block_rows frames
+    '''
+    block = _Block()
+    match = _DOWN.match
+    for n, text in enumerate(lines, 1):
+        m = match(text)
+        if m is None:
+            continue
+        h = text[m.end():].rstrip()
+        # a truncated line keeps the bytes that made it into the log
+        length = (len(h) + 1) // 3
+        assert length <= width, 'line %d: %dB frame exceeds width %d' % (n, length, width)
+        block.hex.append(h)
+        block.length.append(length)
+        block.antenna.append(int(m.group(1)))
+        block.line.append(n)
+        if len(block) >= block_rows:
+            yield _columns(block, width)
+            block = _Block()
+    if len(block):
+        yield _columns(block, width)
+
+def _columns(block:_Block, width:int) -> dict[str, np.ndarray]:
+    return {
+        'frames':  block.frames(width),
+        'length':  np.array(block.length, dtype=np.uint16),
+        'antenna': np.array(block.antenna, dtype=np.uint8),
+        'line':    np.array(block.line, dtype=np.uint32),
+    }
+
+def convert(paths:Iterable[Union[str, os.PathLike]], out:Union[str, os.PathLike, BinaryIO],
+            width:int=FRAME_WIDTH) -> int:
+    '''
+    Convert MPI logs into a single archive (see module docstring); returns the frame count
+    '''
+    paths = sorted(os.fspath(p) for p in paths)
+    blocks = []
+    for i, path in enumerate(paths):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for cols in parse(f, width):
+                cols['log'] = np.full(len(cols['length']), i, dtype=np.uint16)
+                blocks.append(cols)
+
+    if not blocks:
+        blocks.append(_columns(_Block(), width))
+        blocks[0]['log'] = np.zeros(0, dtype=np.uint16)
+    columns = {k: np.concatenate([b[k] for b in blocks]) for k in blocks[0]}
+    # short frames still carry a full header, so the first 4 columns are valid
+    columns.update(csp.HeaderV1.decode_array(columns['frames'][:, :4]))
+    columns['logs'] = np.array([os.path.basename(p) for p in paths], dtype=str)
+    np.savez(out, **columns)
+    return len(columns['length'])
+
+def load(path:Union[str, os.PathLike]) -> dict[str, np.ndarray]:
+    '''
+    Read a whole archive into memory as a dict of columns
+    '''
+    with np.load(path) as archive:
+        return {k: archive[k] for k in archive.files}
+
+def bulk_files(archive:dict[str, np.ndarray]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    '''
+    Reassemble the bulk file downlinked in each log of an archive.
+    returns {log name: (data, valid)}: uint8 file contents by offset, and a
+    bool mask of the bytes that were received (missing chunks read as 0)
+    '''
+    frames, length = archive['frames'], archive['length'].astype(np.intp)
+    start = 4 + BULK_HEADER
+    rows = np.flatnonzero((frames[:, 4] == BULK_TYPE) & (length > start))
+    offset = np.ascontiguousarray(frames[rows, 7:11]).view('<u4').ravel().astype(np.intp)
+    log = archive['log'][rows]
+    # order chunks by (log, offset) and drop repeats of the same chunk
+    order = np.lexsort((offset, log))
+    rows, offset, log = rows[order], offset[order], log[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (np.diff(log) != 0) | (np.diff(offset) != 0)
+    rows, offset, log = rows[first], offset[first], log[first]
+    size = length[rows] - start
+
+    # payload bytes of all chunks back to back, and the file position of each
+    payload = frames[rows, start:]
+    flat = payload[np.arange(payload.shape[1]) < size[:, None]]
+    ends = np.cumsum(size)
+    pos = np.arange(len(flat)) + np.repeat(offset - (ends - size), size)
+
+    out = {}
+    bounds = np.searchsorted(log, np.arange(len(archive['logs']) + 1))
+    for i, name in enumerate(archive['logs']):
+        lo, hi = bounds[i], bounds[i + 1]
+        if lo == hi:
+            continue
+        a, b = ends[lo] - size[lo], ends[hi - 1]
+        data = np.zeros(offset[hi - 1] + size[hi - 1], dtype=np.uint8)
+        valid = np.zeros(len(data), dtype=bool)
+        data[pos[a:b]] = flat[a:b]
+        valid[pos[a:b]] = True
+        out[str(name)] = (data, valid)
+    return out
+
+_STAMP = re.compile(rb'\{"[a-z_]+":[ -~]*?\}')
+
+def decode_samples(data:Union[bytes, np.ndarray], valid:Optional[np.ndarray]=None) -> dict:
+    '''
+    Decode one MPI bulk file into samples.
+    data:  file contents; valid: optional bool mask of received bytes
+    returns a dict of
+      samples       (n,) uint16   every sample of the complete records, in file order
+      timestamp_ms  (n,) float64  sample time, interpolated between the JSON stamps
+      index, offset (m,)          record counter and file offset of each record
+      header        (m, 14) uint8
+      stamps        list of the JSON stamps as (offset, dict)
+    Records that are cut short or overlap a missing byte are skipped.
+    '''
+    buf = np.frombuffer(data, dtype=np.uint8)
+    stamps, spans = [], []
+    for m in _STAMP.finditer(buf.tobytes() if isinstance(data, np.ndarray) else data):
+        try:
+            stamps.append((m.start(), json.loads(m.group())))
+        except ValueError:
+            continue
+        spans.append(m.span())
+
+    # stamps are written into the middle of records: cut them out of the stream
+    cuts = np.array(spans, dtype=np.intp).reshape(-1, 2)
+    keep = np.concatenate(([0], cuts[:, 1])), np.concatenate((cuts[:, 0], [len(buf)]))
+    stream = np.concatenate([buf[a:b] for a, b in zip(*keep)])
+    removed = np.concatenate(([0], np.cumsum(cuts[:, 1] - cuts[:, 0])))
+    cut_at = cuts[:, 0] - removed[:-1]     # stream position of each cut
+
+    n = MPI_RECORD.itemsize
+    sync = np.flatnonzero((stream[:-3] == 0x0c) & (stream[1:-2] == 0xff) &
+                          (stream[2:-1] == 0xff) & (stream[3:] == 0x0c))
+    sync = sync[sync + n <= len(stream)]
+    # a record is complete if no other sync word and no missing byte falls inside it
+    ok = np.ones(len(sync), dtype=bool)
+    ok[:-1] = np.diff(sync) >= n
+    if valid is not None and not valid.all():
+        missing = np.concatenate([~valid[a:b] for a, b in zip(*keep)])
+        missing_count = np.concatenate(([0], np.cumsum(missing)))
+        ok &= missing_count[sync + n] == missing_count[sync]
+    sync = sync[ok]
+
+    # contiguous runs of records are viewed in place, not copied
+    runs = np.split(sync, np.flatnonzero(np.diff(sync) != n) + 1) if len(sync) else []
+    views = [np.frombuffer(stream, MPI_RECORD, len(r), r[0]) for r in runs]
+    records = np.concatenate(views) if views else np.zeros(0, MPI_RECORD)
+
+    samples = records['samples'].astype(np.uint16).ravel()
+    at = (sync[:, None] + MPI_RECORD.fields['samples'][1] + 2 * np.arange(65)).ravel()
+    stamped = [(cut_at[i], st['timestamp_ms']) for i, (_, st) in enumerate(stamps) if 'timestamp_ms' in st]
+    if stamped:
+        timestamp_ms = np.interp(at, *np.array(stamped, dtype=np.float64).T)
+    else:
+        timestamp_ms = np.full(len(samples), np.nan)
+    return {
+        'samples': samples,
+        'timestamp_ms': timestamp_ms,
+        'index': records['index'].astype(np.uint16),
+        'offset': sync + removed[np.searchsorted(cut_at, sync, side='right')],
+        'header': records['header'],
+        'stamps': stamps,
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    n = convert(sys.argv[2:], sys.argv[1])
+    print('%d frames from %d logs -> %s' % (n, len(sys.argv) - 2, sys.argv[1]))
@@ -0,0 +1,163 @@
+'''
+Shared-memory ring buffer of decoded downlink frames for same-host clients
+
+The gateway (single producer) writes each frame once; any number of reader
+processes attach by name and keep their own cursor, so no frame is copied per
+client. Readers that fall more than one ring behind are overrun: they skip to
+the newest data and count the frames they lost.
+
+Layout: 40-byte header (magic, capacity, write position, frame count, reserve
+position), then `capacity` bytes of records. A record is length (uint32), seq (uint64) and
+unix time (double) followed by the frame, padded to 8 bytes. Positions grow
+without bound; the offset in the ring is position % capacity. The writer
+publishes the end of the record it is about to write as the reserve position
+before touching any byte, so a reader knows its data is intact as long as
+reserve - cursor <= capacity.
+'''
+import asyncio
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Union
+
+_HDR = struct.Struct('<8sQQQQ')
+_POS = struct.Struct('<QQ')        # write position, frame count (at offset 16)
+_RESERVE = struct.Struct('<Q')     # reserve position (at offset 32)
+_REC = struct.Struct('<IQd')
+_MAGIC = b'CSPRING2'
+_WRAP = 0xFFFFFFFF
+
+_created:set[str] = set()   # rings owned by a RingWriter in this process
+
+class RingWriter:
+    def __init__(self, name:str, capacity:int=1 << 20):
+        assert capacity % 8 == 0, 'capacity must be a multiple of 8'
+        try:
+            # a segment left behind by a crashed gateway
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name, create=True, size=_HDR.size + capacity)
+        _created.add(name)
+        self.name = name
+        self.buf = self.shm.buf
+        self.capacity = capacity
+        self.pos = 0
+        self.seq = 0
+        _HDR.pack_into(self.buf, 0, _MAGIC, capacity, 0, 0, 0)
+
+    def write(self, frame:Union[bytes, memoryview], timestamp:Optional[float]=None):
+        n = len(frame)
+        size = (_REC.size + n + 7) & ~7
+        assert size <= self.capacity // 2, 'frame too large for the ring'
+        buf, cap = self.buf, self.capacity
+
+        off = self.pos % cap
+        pad = cap - off if cap - off < size else 0
+        # readers must see the bytes we are about to overwrite as gone
+        _RESERVE.pack_into(buf, 32, self.pos + pad + size)
+        if pad:
+            struct.pack_into('<I', buf, _HDR.size + off, _WRAP)
+            self.pos += pad
+            off = 0
+
+        start = _HDR.size + off
+        _REC.pack_into(buf, start, n, self.seq, time.time() if timestamp is None else timestamp)
+        buf[start + _REC.size:start + _REC.size + n] = frame
+        self.pos += size
+        self.seq += 1
+        # publish after the record is in place
+        _POS.pack_into(buf, 16, self.pos, self.seq)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+        _created.discard(self.name)
+
+class RingReader:
+    '''
+    Attach to a gateway ring by name. Reading starts at the newest frame.
+    '''
+    def __init__(self, name:str):
+        self.shm = shared_memory.SharedMemory(name)
+        # only the creating gateway may unlink the segment
+        if name not in _created:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.buf = self.shm.buf
+        magic, self.capacity, self.cursor, self.next_seq, _ = _HDR.unpack_from(self.buf, 0)
+        assert magic == _MAGIC, 'not a pycsp ring: %s' % name
+        self.overruns = 0
+        self.lost = 0
+
+    def _skip_to_head(self):
+        self.cursor, seq = _POS.unpack_from(self.buf, 16)
+        self.overruns += 1
+        self.lost += seq - self.next_seq
+        self.next_seq = seq
+
+    def read(self, max_count:int=256) -> list[tuple[int, float, bytes]]:
+        '''
+        Frames written since the last call as (seq, unix time, frame), oldest first
+        '''
+        buf, cap = self.buf, self.capacity
+        head, _ = _POS.unpack_from(buf, 16)
+        if _RESERVE.unpack_from(buf, 32)[0] - self.cursor > cap:
+            self._skip_to_head()
+            return []
+
+        out = []
+        cursor = self.cursor
+        while cursor < head and len(out) < max_count:
+            off = cursor % cap
+            if struct.unpack_from('<I', buf, _HDR.size + off)[0] == _WRAP:
+                cursor += cap - off
+                continue
+            # a record torn by the writer can hold any length; the check below drops it
+            if cap - off < _REC.size:
+                break
+            n, seq, t = _REC.unpack_from(buf, _HDR.size + off)
+            if cap - off - _REC.size < n:
+                break
+            start = _HDR.size + off + _REC.size
+            out.append((seq, t, bytes(buf[start:start + n])))
+            cursor += (_REC.size + n + 7) & ~7
+
+        # the writer may have started overwriting what we copied
+        if _RESERVE.unpack_from(buf, 32)[0] - self.cursor > cap:
+            self._skip_to_head()
+            return []
+
+        self.cursor = cursor
+        if out:
+            self.lost += out[0][0] - self.next_seq
+            self.next_seq = out[-1][0] + 1
+        return out
+
+    def wait(self, timeout:Optional[float]=None, poll:float=0.005) -> list[tuple[int, float, bytes]]:
+        '''
+        Blocking read: poll until frames arrive or timeout expires
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not (frames := self.read()):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(poll)
+        return frames
+
+    async def frames(self, poll:float=0.005):
+        '''
+        Async iterator of (seq, unix time, frame)
+        '''
+        while True:
+            frames = self.read()
+            if not frames:
+                await asyncio.sleep(poll)
+            for f in frames:
+                yield f
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
@@ -6,11 +6,14 @@
 
 import pycsp as csp
 import pycsplink as csplink
-import socket
+import asyncio
 import time
 
-from typing import Literal
+from typing import Literal, Optional
 from types import SimpleNamespace
+from collections import OrderedDict
+import bisect
+import re
 import struct
 
 
@@ -40,29 +43,6 @@ DPORT_UPTIME = 6
 # In[ ]:
 
 
-class GrcLink:
-    def __init__(self, addr='127.0.0.1', port=52001, mtu=1024, timeout=1):
-        self.s = socket.create_connection((addr, port))
-        self.mtu = mtu
-        self.timeout = timeout
-        self.s.settimeout(timeout)
-
-    def __del__(self):
-        self.close()
-
-    def send(self, raw_data, data):
-        self.s.sendall(raw_data + data)
-
-    def recv(self):
-        return self.s.recv(self.mtu)
-
-    def close(self):
-        self.s.close()
-
-
-# In[ ]:
-
-
 def parse_obc_downlink(data):
     if data[0] == 3:
         return data[1:].decode()
@@ -77,8 +57,8 @@ def parse_obc_downlink(data):
         )
 
         # Extract and decode content
-        raw_content = data[13:200]
-        content = raw_content.split(b"\x00", 1)[0].decode("ascii", errors="replace")
+        raw_content = data[13:200].split(b"\x00", 1)[0]
+        content = raw_content.decode("ascii", errors="replace")
 
         return {
             "tssent": tssent,
@@ -87,6 +67,7 @@ def parse_obc_downlink(data):
             "sequence_number": seq_num,
             "total_packets": total_packets,
             "content": content,
+            "data": raw_content,
         }
 
     else:
@@ -96,62 +77,313 @@ def parse_obc_downlink(data):
 # In[ ]:
 
 
-with open('hmac_key.txt', 'r') as f:
-    hmac_key = bytes.fromhex(f.read().strip())
-
-uplink = csplink.AX100(hmac_key=hmac_key, crc=False, reed_solomon=True, randomize=True, 
-                       len_field=True, syncword=True, prefill=32, tailfill=1)
-downlink = csplink.AX100(hmac_key=None, crc=True, reed_solomon=False, randomize=False, 
-                       len_field=False, syncword=False, exception=False, verbose=True)
+class ObcResponseAssembler:
+    '''
+    Reassembles multi-packet type-4 OBC responses, keyed by tssent.
+    The raw bytes of each chunk ('data') go into a slot array sized by
+    total_packets when the first chunk arrives; the full response is returned
+    by push() as soon as every slot is filled, its 'data' joined and decoded
+    once into 'content'. Partials idle for `timeout` seconds, or the oldest
+    ones when buffered content exceeds `max_bytes`, are evicted and reported
+    by expire().
+    seq_base: sequence number of the first chunk of a response. Chunks whose
+    sequence number falls outside the response are counted in `malformed`.
+    '''
+    def __init__(self, seq_base=0, max_bytes=1 << 20, timeout=60.0):
+        self.seq_base = seq_base
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.partials = OrderedDict()   # tssent -> SimpleNamespace, least recently updated first
+        self.nbytes = 0
+        self.evicted = []               # (tssent, missing sequence numbers) not yet reported
+        self.completed = 0
+        self.duplicates = 0
+        self.malformed = 0
+
+    def push(self, chunk: dict) -> Optional[dict]:
+        total = chunk['total_packets']
+        idx = chunk['sequence_number'] - self.seq_base
+        if not 0 <= idx < total:
+            self.malformed += 1
+            return None
+
+        p = self.partials.get(chunk['tssent'])
+        if p is None or len(p.slots) != total:
+            if p is not None:
+                self._drop(chunk['tssent'])
+            p = SimpleNamespace(slots=[None] * total, received=0, nbytes=0, updated=0.0)
+            self.partials[chunk['tssent']] = p
+        self.partials.move_to_end(chunk['tssent'])
+        p.updated = time.monotonic()
+        p.response_code = chunk['response_code']
+        p.duration_ms = chunk['duration_ms']
+
+        if p.slots[idx] is not None:
+            self.duplicates += 1
+            return None
+        content = chunk['data']
+        p.slots[idx] = content
+        p.received += 1
+        p.nbytes += len(content)
+        self.nbytes += len(content)
+
+        if p.received < total:
+            while self.nbytes > self.max_bytes and len(self.partials) > 1:
+                self._evict(next(iter(self.partials)))
+            return None
+
+        self._drop(chunk['tssent'])
+        self.completed += 1
+        data = b''.join(p.slots)
+        return {
+            'tssent': chunk['tssent'],
+            'response_code': p.response_code,
+            'duration_ms': p.duration_ms,
+            'total_packets': total,
+            'content': data.decode('ascii', errors='replace'),
+            'data': data,
+        }
 
-ttc = None
+    def missing(self, tssent) -> list:
+        p = self.partials.get(tssent)
+        if p is None:
+            return []
+        return [i + self.seq_base for i, c in enumerate(p.slots) if c is None]
+
+    def _drop(self, tssent):
+        p = self.partials.pop(tssent)
+        self.nbytes -= p.nbytes
+
+    def _evict(self, tssent):
+        self.evicted.append((tssent, self.missing(tssent)))
+        self._drop(tssent)
+
+    def expire(self) -> list:
+        '''
+        Evict partials idle for longer than timeout; returns (tssent, missing
+        sequence numbers) for them and for any evicted to stay under max_bytes
+        '''
+        limit = time.monotonic() - self.timeout
+        while self.partials:
+            tssent, p = next(iter(self.partials.items()))
+            if p.updated >= limit:
+                break
+            self._evict(tssent)
+        evicted, self.evicted = self.evicted, []
+        return evicted
 
 
 # In[ ]:
 
 
-if not ttc is None: ttc.close()
-ttc = GrcLink()
+class RangeSet:
+    '''
+    Disjoint, sorted half-open byte ranges [start, end); adjacent and
+    overlapping ranges are merged on add()
+    '''
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        if start >= end:
+            return
+        i = bisect.bisect_left(self.ends, start)
+        j = bisect.bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def gaps(self, start, end) -> list:
+        '''
+        Ranges within [start, end) not covered by the set
+        '''
+        out = []
+        i = bisect.bisect_right(self.ends, start)
+        while start < end:
+            if i == len(self.starts) or self.starts[i] >= end:
+                out.append((start, end))
+                break
+            if self.starts[i] > start:
+                out.append((start, self.starts[i]))
+            start = self.ends[i]
+            i += 1
+        return out
+
+    @property
+    def total(self) -> int:
+        return sum(self.ends) - sum(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+BULK_TYPE = 0x10
+FS_READ_HEX_MAX = 4096      # bytes per fs_read_file_hex request (~45 type-4 chunks of hex)
+
+class BulkDownlink:
+    '''
+    One bulk file downlink (comms_bulk_file_downlink_start). Every chunk is
+    written at its file offset into a sparse file on the ground and its byte
+    range recorded in a RangeSet. After the pass, missing() lists exactly the
+    ranges never received and requests() the fs_read_file_hex telecommands
+    that fetch them; their decoded contents go back in with fill().
+    Chunk payload: type 0x10, seq and packet count (low bytes), uint32 LE
+    offset, then the file data.
+    '''
+    header = struct.Struct('<BBBI')
+
+    def __init__(self, out_path, file_path=None, start=0, size=None):
+        self.out_path = out_path
+        self.f = open(out_path, 'w+b')
+        self.file_path = file_path
+        self.start = start
+        self.size = size        # bytes from start, once the satellite reports it
+        self.end = start        # highest byte received so far
+        self.received = RangeSet()
+        self.chunks = 0
+        self.duplicates = 0
+
+    def push(self, payload) -> int:
+        '''
+        Place one type-0x10 chunk; returns its file offset
+        '''
+        if len(payload) < self.header.size or payload[0] != BULK_TYPE:
+            raise ValueError('not a bulk file chunk')
+        _, _, _, offset = self.header.unpack_from(payload)
+        data = payload[self.header.size:]
+        if not self.received.gaps(offset, offset + len(data)):
+            self.duplicates += 1
+        else:
+            self.fill(offset, data)
+            self.chunks += 1
+        return offset
+
+    def fill(self, offset, data):
+        self.f.seek(offset - self.start)
+        self.f.write(data)
+        self.received.add(offset, offset + len(data))
+        self.end = max(self.end, offset + len(data))
+
+    def finish(self, size, file_path=None):
+        '''
+        End of pass: size is the byte count the satellite reports as downlinked
+        '''
+        self.size = size
+        self.file_path = file_path or self.file_path
+        self.f.truncate(size)
+        self.f.flush()
+
+    def missing(self) -> list:
+        end = self.end if self.size is None else self.start + self.size
+        return self.received.gaps(self.start, end)
+
+    def requests(self, max_len=FS_READ_HEX_MAX, merge_gap=0) -> list:
+        '''
+        Fewest fs_read_file_hex commands of up to max_len bytes covering
+        missing(); gaps at most merge_gap received bytes apart share a request
+        '''
+        assert self.file_path, 'file path unknown, pass it to finish()'
+        spans = []
+        for a, b in self.missing():
+            if spans and a - spans[-1][1] <= merge_gap and b - spans[-1][0] <= max_len:
+                spans[-1][1] = b
+                continue
+            while b - a > max_len:
+                spans.append([a, a + max_len])
+                a += max_len
+            spans.append([a, b])
+        return ['CTS1+fs_read_file_hex(%s,%d,%d)!' % (self.file_path, a, b - a) for a, b in spans]
+
+    def close(self):
+        self.f.close()
 
 
 # In[ ]:
 
 
-#ttc.close()
+link = csplink.LinkProfile.from_key_file('hmac_key.txt')
+uplink, downlink = link.uplink, link.downlink
+
+# this process never transmits, so echoes of frames sent by pycsp_tx or the
+# gateway are recognized by their uplink HMAC trailer
+echoes = csplink.EchoFilter(hmac_engine=uplink.hmac_engine)
+
+responses = ObcResponseAssembler()
+# every bulk file downlink of this session, the current one last; each is
+# opened by its first chunk. Downlinks that do not start at offset 0 need a
+# BulkDownlink(..., start=offset) appended by hand.
+bulk_downlinks = []
+bulk_done = re.compile(r'Bulk downlink complete\. (\d+) bytes \((\d+) packets\) downlinked\. File: (\S+)')
 
 
 # In[ ]:
 
 
-while True:
-    ttc = GrcLink(timeout=1)
+# sinks: called with every decoded packet
+
+def print_sink(resp):
+    if resp.header.src == OBC_ADDR and resp.header.dst == GCS_ADDR:
+        if resp.payload[:1] == bytes([BULK_TYPE]):
+            if not bulk_downlinks or bulk_downlinks[-1].size is not None:
+                name = time.strftime('bulk_%Y%m%d_%H%M%S') + '_%d.bin' % len(bulk_downlinks)
+                bulk_downlinks.append(BulkDownlink(name))
+            bulk_downlinks[-1].push(resp.payload)
+            return
+        msg = parse_obc_downlink(resp.payload)
+        if isinstance(msg, dict):
+            malformed = responses.malformed
+            full = responses.push(msg)
+            if full:
+                print(full)
+            elif responses.malformed != malformed:
+                print('response %d: chunk %d out of range for %d packets' % (msg['tssent'], msg['sequence_number'], msg['total_packets']))
+            else:
+                print('response %d: chunk %d of %d' % (msg['tssent'], msg['sequence_number'], msg['total_packets']))
+        else:
+            print(msg)
+            done = bulk_done.search(msg) if isinstance(msg, str) else None
+            if done and bulk_downlinks:
+                bulk = bulk_downlinks[-1]
+                bulk.finish(int(done.group(1)), done.group(3))
+                print('bulk file %s: %d chunks, %d bytes missing in %s' % (
+                    bulk.file_path, bulk.chunks, sum(b - a for a, b in bulk.missing()), bulk.missing()))
+                for cmd in bulk.requests():
+                    print(cmd)
+    else:
+        print(resp, resp.payload.hex())
 
-    try:
-        rx = ttc.recv()
-        # filter echo packets
-        # TODO: fix this dirty impl
-        if csp.HeaderV1.from_bytes(rx[0:4]).src == GCS_ADDR:
-            continue
+    for tssent, missing in responses.expire():
+        print('response %d incomplete, missing chunks %s' % (tssent, missing))
 
-        # decode packets
-        resp = downlink.decode(rx)
-        if not resp:
-            print(resp)
-            continue
+class FileSink:
+    '''Append one line per packet: unix time, then the CSP header + payload in hex'''
+    def __init__(self, path='downlink.log'):
+        self.f = open(path, 'a')
 
-        if resp.header.src == OBC_ADDR and resp.header.dst == GCS_ADDR:
-            print(parse_obc_downlink(resp.payload))
-        else:
-            print(resp, resp.payload.hex())
+    def __call__(self, resp):
+        self.f.write('%.3f %s\n' % (time.time(), bytes(resp.raw).hex()))
+        self.f.flush()
+
+
+# In[ ]:
+
+
+receiver = csplink.GrcReceiver([print_sink], decode=downlink.decode, echo_filter=echoes)
+
+
+# In[ ]:
 
-    except ValueError as e:
-        print(e)
-    except TimeoutError:
-        pass
-    except KeyboardInterrupt:
-        pass
 
-    ttc.close()
+# in Jupyter use: await receiver.run()
+try:
+    asyncio.run(receiver.run())
+except KeyboardInterrupt:
+    pass
 
 
 # In[ ]:
@@ -6,6 +6,7 @@
 
 import pycsp as csp
 import pycsplink as csplink
+import pycsp_wire as wire
 import socket
 import time
 
@@ -61,15 +62,11 @@ class GrcLink:
 # In[11]:
 
 
-with open('hmac_key.txt', 'r') as f:
-    hmac_key = bytes.fromhex(f.read().strip())
-
-uplink = csplink.AX100(hmac_key=hmac_key, crc=False, reed_solomon=True, randomize=True, 
-                       len_field=True, syncword=True, prefill=32, tailfill=1)
-downlink = csplink.AX100(hmac_key=None, crc=True, reed_solomon=False, randomize=False, 
-                       len_field=False, syncword=False, exception=False, verbose=True)
+link = csplink.LinkProfile.from_key_file('hmac_key.txt')
+uplink, downlink = link.uplink, link.downlink
 
 ttc = None
+gateway = None   # pycsp_wire.QueryClient, opened by the first cts_query
 
 
 # In[12]:
@@ -116,19 +113,13 @@ def cts_query(prop:Literal['process', 'memfree', 'buffree', 'uptime'], dst=TTC_A
         'uptime' : DPORT_UPTIME
     }[prop]
 
-    SPORT = 16 # 0..63
-    packet = csp.Packet(GCS_ADDR, dst, dport, SPORT, 
-                 prio='norm', hmac_key=None, crc=True)
-
-    ttc.send(uplink.encode(packet), b'')
-    ttc.recv(1) # receive echo
-    try:
-        rx = ttc.recv(1)
-        resp = downlink.decode(rx)
-        val = int.from_bytes(resp.payload, 'big')
-    except TimeoutError:
-        val = None
-        pass
+    # through the gateway: it picks a free source port, matches the reply
+    # and times out, so queries no longer read echoes off the radio link
+    global gateway
+    if gateway is None:
+        gateway = wire.QueryClient()
+    reply = gateway.query(dst, dport, timeout=1.0, prio=csp.HeaderV1.PRIO_NORM, crc=True)
+    val = None if reply is None else int.from_bytes(reply[4:], 'big')
 
     return val
 
@@ -165,13 +156,8 @@ def cts_query(prop:Literal['process', 'memfree', 'buffree', 'uptime'], dst=TTC_A
 # In[15]:
 
 
-with open('hmac_key.txt', 'r') as f:
-    hmac_key = bytes.fromhex(f.read().strip())
-
-uplink = csplink.AX100(hmac_key=hmac_key, crc=False, reed_solomon=True, randomize=True, 
-                       len_field=True, syncword=True, prefill=32, tailfill=1)
-downlink = csplink.AX100(hmac_key=None, crc=True, reed_solomon=False, randomize=False, 
-                       len_field=False, syncword=False, exception=False, verbose=True)
+link = csplink.LinkProfile.from_key_file('hmac_key.txt')
+uplink, downlink = link.uplink, link.downlink
 
 ttc = None
 
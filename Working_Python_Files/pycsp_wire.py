@@ -0,0 +1,188 @@
+'''
+Wire format of the gateway TCP ports (53001 / 53002)
+
+Every frame is an 8-byte little-endian header (version, length) followed by
+`length` bytes of contents. The version word selects the frame type:
+
+  PACKET    one payload (53001) or CSP packet (53002)
+  SUBSCRIBE ASCII header filter, see pycsp_gateway._parse_filter
+  BATCH     several packets, each prefixed by a uint32 length
+  REPLAY    ASCII b'seq=N' or b'time=T' (unix time): send journaled frames
+            from there on before live ones
+  QUERY     request/response through pycsp_gateway.query(). Client to gateway:
+            id (uint32), dst, dport, prio, crc (uint8 each), timeout (float32
+            seconds), then the request payload. Gateway to client: id, status
+            (uint8), then the reply (CSP header + payload) or an error text
+
+A client that sends a BATCH frame (an empty one is enough) negotiates batching:
+from then on the gateway also sends it BATCH frames.
+'''
+import asyncio
+import socket
+import struct
+from typing import Iterable, Optional, Union
+
+PACKET    = 0
+SUBSCRIBE = 1
+BATCH     = 2
+REPLAY    = 3
+QUERY     = 4
+
+QUERY_OK      = 0
+QUERY_TIMEOUT = 1
+QUERY_ERROR   = 2
+
+_HDR = struct.Struct('<II')
+_LEN = struct.Struct('<I')
+_QUERY = struct.Struct('<IBBBBf')
+_REPLY = struct.Struct('<IB')
+
+def frame(data:bytes, kind:int=PACKET) -> bytes:
+    return _HDR.pack(kind, len(data)) + data
+
+def frame_parts(packets:Iterable[bytes], batch:bool=False) -> list[bytes]:
+    '''
+    Frames for many packets as a list of buffers for writer.writelines(),
+    so the contents are never concatenated: one PACKET frame per packet,
+    or a single BATCH frame holding all of them.
+    '''
+    parts = []
+    if batch:
+        total = 0
+        parts.append(b'')
+        for p in packets:
+            parts.append(_LEN.pack(len(p)))
+            parts.append(p)
+            total += _LEN.size + len(p)
+        parts[0] = _HDR.pack(BATCH, total)
+    else:
+        for p in packets:
+            parts.append(_HDR.pack(PACKET, len(p)))
+            parts.append(p)
+    return parts
+
+def batch(packets:Iterable[bytes]) -> bytes:
+    return b''.join(frame_parts(packets, batch=True))
+
+def query(qid:int, dst:int, dport:int, payload:bytes=b'', timeout:float=5.0,
+          prio:int=2, crc:bool=False) -> bytes:
+    return frame(_QUERY.pack(qid, dst, dport, prio, crc, timeout) + payload, QUERY)
+
+def parse_query(data:bytes) -> tuple[int, int, int, int, bool, float, bytes]:
+    '''
+    Contents of a QUERY request as (id, dst, dport, prio, crc, timeout, payload)
+    '''
+    if len(data) < _QUERY.size:
+        raise ValueError('query request too short')
+    qid, dst, dport, prio, crc, timeout = _QUERY.unpack_from(data)
+    return qid, dst, dport, prio, bool(crc), timeout, data[_QUERY.size:]
+
+def query_reply(qid:int, status:int, data:bytes=b'') -> bytes:
+    return frame(_REPLY.pack(qid, status) + data, QUERY)
+
+def parse_query_reply(data:bytes) -> tuple[int, int, bytes]:
+    '''
+    Contents of a QUERY reply as (id, status, reply or error text)
+    '''
+    if len(data) < _REPLY.size:
+        raise ValueError('query reply too short')
+    qid, status = _REPLY.unpack_from(data)
+    return qid, status, data[_REPLY.size:]
+
+class FrameReader:
+    '''
+    Buffered parser: push() takes whatever one recv()/read() returned and
+    returns every complete frame in it as (kind, contents). BATCH frames are
+    expanded into their PACKET items, and `batched` records that the peer
+    uses batching.
+    '''
+    def __init__(self, max_len:int=1 << 20):
+        self.buf = bytearray()
+        self.max_len = max_len
+        self.batched = False
+
+    def push(self, data:Union[bytes, bytearray, memoryview]) -> list[tuple[int, bytes]]:
+        buf = self.buf
+        buf += data
+        out = []
+        pos, end = 0, len(buf)
+        while end - pos >= _HDR.size:
+            kind, length = _HDR.unpack_from(buf, pos)
+            if length > self.max_len:
+                raise ValueError('frame length %d exceeds %d' % (length, self.max_len))
+            start = pos + _HDR.size
+            if end - start < length:
+                break
+            pos = start + length
+            if kind != BATCH:
+                out.append((kind, bytes(buf[start:pos])))
+                continue
+            self.batched = True
+            while start < pos:
+                if start + _LEN.size > pos:
+                    raise ValueError('truncated packet length in batch')
+                (n,) = _LEN.unpack_from(buf, start)
+                start += _LEN.size
+                if start + n > pos:
+                    raise ValueError('batch packet length %d overruns its frame' % n)
+                out.append((PACKET, bytes(buf[start:start + n])))
+                start += n
+        if pos:
+            del buf[:pos]
+        return out
+
+    async def read(self, reader:asyncio.StreamReader, n:int=65536) -> list[tuple[int, bytes]]:
+        '''
+        Read until at least one frame is complete, or until the peer switches
+        to batching (an empty BATCH frame yields no frames); raises
+        IncompleteReadError at EOF
+        '''
+        while True:
+            data = await reader.read(n)
+            if not data:
+                raise asyncio.IncompleteReadError(bytes(self.buf), None)
+            batched = self.batched
+            frames = self.push(data)
+            if frames or self.batched != batched:
+                return frames
+
+class QueryClient:
+    '''
+    Blocking request/response client for scripts: each query() is sent to the
+    gateway as a QUERY frame and waits for its reply. Downlink frames the
+    gateway forwards on the same connection are discarded.
+    '''
+    def __init__(self, addr:str='127.0.0.1', port:int=53002):
+        self.s = socket.create_connection((addr, port))
+        self.frames = FrameReader()
+        self.replies:dict[int, tuple[int, bytes]] = {}
+        self.next_id = 0
+
+    def query(self, dst:int, dport:int, payload:bytes=b'', timeout:float=5.0,
+              prio:int=2, crc:bool=False) -> Optional[bytes]:
+        '''
+        Reply packet (CSP header + payload), or None on timeout; raises
+        ConnectionError when the gateway could not send the request
+        '''
+        qid = self.next_id
+        self.next_id = (self.next_id + 1) & 0xffffffff
+        self.s.sendall(query(qid, dst, dport, payload, timeout, prio, crc))
+        # the gateway times the query from transmission; allow for queueing
+        self.s.settimeout(timeout + 30.0)
+        while qid not in self.replies:
+            data = self.s.recv(65536)
+            if not data:
+                raise ConnectionError('gateway closed the connection')
+            for kind, contents in self.frames.push(data):
+                if kind == QUERY:
+                    rid, status, reply = parse_query_reply(contents)
+                    self.replies[rid] = (status, reply)
+        status, reply = self.replies.pop(qid)
+        if status == QUERY_TIMEOUT:
+            return None
+        if status != QUERY_OK:
+            raise ConnectionError(reply.decode('ascii', errors='replace'))
+        return reply
+
+    def close(self):
+        self.s.close()
@@ -1,8 +1,15 @@
 import reed_solomon_ccsds as rs
-from pycsp import Packet, HMACEngine, CRCEngine
-from typing import Union, Optional
+import numpy as np
+from pycsp import Packet, CodecProfile
+from typing import Union, Optional, AsyncIterator
+from array import array
+import os
 import socket
 import asyncio
+import time
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 try:
     import pyserial
 except:
@@ -15,6 +22,8 @@ class Golay24:
         0x080ED1, 0x040DA3, 0x020B47, 0x01068F,
         0x008D1D, 0x004A3B, 0x002477, 0x001FFE,
     ]
+    _ENC: Optional[array] = None
+    _SYN: Optional[array] = None
     
     @staticmethod  
     def __parity(x: int) -> int:
@@ -24,9 +33,9 @@ class Golay24:
         return x.bit_count() & 1
 
     @classmethod     
-    def encode(cls, r: int) -> int:
+    def encode_loop(cls, r: int) -> int:
         """
-        Encode a 12‑bit word into a 24‑bit Golay codeword.
+        Encode a 12‑bit word into a 24‑bit Golay codeword (bitwise reference).
     
         Args:
             data: integer whose lower 12 bits are the information word (0 ≤ data < 4096).
@@ -49,9 +58,9 @@ class Golay24:
         return codeword
 
     @classmethod  
-    def decode(cls, codeword: int) -> tuple[int, int]:
+    def decode_loop(cls, codeword: int) -> tuple[int, int]:
         """
-        Decode a 24‑bit Golay codeword.
+        Decode a 24‑bit Golay codeword (bitwise reference).
     
         Args:
             codeword: 24‑bit integer (parity<<12 | data)
@@ -99,6 +108,63 @@ class Golay24:
         # Step 7: uncorrectable
         return (codeword, -1)
 
+    @classmethod
+    def build_tables(cls, cache:Optional[str]=None) -> tuple[array, array]:
+        """
+        Build the 4096-entry encode table and syndrome -> error pattern table.
+        Entries of the syndrome table are -1 where the error is uncorrectable.
+
+        Args:
+            cache: optional file path; tables are loaded from it if present,
+                   otherwise built from the bitwise reference and written to it.
+        """
+        if cache and os.path.exists(cache):
+            tables = array('i')
+            with open(cache, 'rb') as f:
+                tables.frombytes(f.read())
+            if len(tables) == 2 * 4096:
+                cls._ENC, cls._SYN = tables[:4096], tables[4096:]
+                return cls._ENC, cls._SYN
+
+        enc = array('i', (cls.encode_loop(r) for r in range(4096)))
+        # a received word with data bits 0 and parity bits s has syndrome s
+        syn = array('i')
+        for s in range(4096):
+            corrected, errcnt = cls.decode_loop(s << cls.N)
+            syn.append(-1 if errcnt < 0 else corrected ^ (s << cls.N))
+
+        if cache:
+            with open(cache, 'wb') as f:
+                f.write((enc + syn).tobytes())
+
+        cls._ENC, cls._SYN = enc, syn
+        return enc, syn
+
+    @classmethod
+    def encode(cls, r: int) -> int:
+        """
+        Encode a 12‑bit word into a 24‑bit Golay codeword by table lookup.
+        """
+        assert r < 4096, 'data must be 0..4095'
+        if cls._ENC is None: cls.build_tables()
+        return cls._ENC[r]
+
+    @classmethod
+    def decode(cls, codeword: int) -> tuple[int, int]:
+        """
+        Decode a 24‑bit Golay codeword by syndrome table lookup.
+
+        Returns:
+            (corrected_codeword, error_count), same as decode_loop.
+        """
+        if cls._ENC is None: cls.build_tables()
+        # syndrome = received parity ^ parity recomputed from received data
+        s = (codeword >> cls.N) ^ (cls._ENC[codeword & 0xFFF] >> cls.N)
+        e = cls._SYN[s]
+        if e < 0:
+            return (codeword, -1)
+        return (codeword ^ e, e.bit_count())
+
 class CCSDSRxScrambler:
     """
     CCSDS RX scrambler:
@@ -141,32 +207,145 @@ class CCSDSRxScrambler:
         0x08, 0x78, 0xC4, 0x4A, 0x66, 0xF5, 0x58,
     ])
 
+    # keystream pre-expanded to the largest frame a Golay length field can describe
+    _KEYSTREAM = (_TABLE * (4096 // len(_TABLE) + 1))[:4096]
+
     def __init__(self, skip:int=0):
         """
         :param skip: number of initial bytes to leave unscrambled
         """
         self.skip = skip
 
-    def __call__(self, data:Union[bytes, bytearray, memoryview]) -> bytes:
+    @classmethod
+    def keystream(cls, n:int) -> memoryview:
+        """
+        Return the first n keystream bytes, extending the cached keystream if needed.
+        """
+        if n > len(cls._KEYSTREAM):
+            reps = n // len(cls._TABLE) + 1
+            cls._KEYSTREAM = (cls._TABLE * reps)[:n]
+        return memoryview(cls._KEYSTREAM)[:n]
+
+    def __call__(self, data:Union[bytes, bytearray, memoryview], inplace:bool=False) -> Union[bytes, bytearray, memoryview]:
         """
         Scramble (descramble) the input data according to the CCSDS RX table.
-        First `skip` bytes are passed through; the rest are XOR’d with the table.
+        First `skip` bytes are passed through; the rest are XOR’d with the table
+        in a single big-integer XOR.
         :param data: input buffer
-        :return: scrambled output as bytes
+        :param inplace: write the result back into `data` (must be writable) and return it
+        :return: scrambled output as bytes, or `data` itself when inplace
         """
-        tbl = self._TABLE
-        tlen = len(tbl)
-        out = bytearray(len(data))
-        for i in range(self.skip, len(data)):
-            out[i] = data[i] ^ tbl[(i - self.skip) % tlen]
-        return out
+        skip = min(self.skip, len(data))
+        body = memoryview(data)[skip:]
+        n = len(body)
+        x = int.from_bytes(body, 'little') ^ int.from_bytes(self.keystream(n), 'little')
+        out = x.to_bytes(n, 'little')
+
+        if inplace:
+            body[:] = out
+            return data
+        return bytes(data[:skip]) + out if skip else out
+
+class ReedSolomon:
+    """
+    CCSDS RS(255, 223), conventional basis, with native shortened-code support.
+      • syndromes and parity are evaluated directly over the shortened codeword,
+        since the implied leading zero padding contributes nothing
+      • error-free codewords are detected from the syndromes alone
+      • correction itself falls back to reed_solomon_ccsds
+    """
+    N = 255
+    K = 223
+    NROOTS = 32
+
+    _EXP: Optional[np.ndarray] = None      # antilog, index >= 510 -> 0 (log of 0 is 511)
+    _LOG: Optional[np.ndarray] = None
+    _SYN_LOG: Optional[np.ndarray] = None  # (32, 255) log of root_i ** power
+    _PAR_LOG: Optional[np.ndarray] = None  # (223, 32) log of the parity of a unit symbol
+
+    @classmethod
+    def build_tables(cls):
+        tab = rs.reed_solomon
+        alpha = [int(a) for a in tab.ALPHA_TO[:cls.N]]
+        exp = np.zeros(1024, dtype=np.uint8)
+        exp[:2 * cls.N] = alpha + alpha
+        log = tab.INDEX_OF.astype(np.int32)
+        log[0] = 511
+
+        roots = (tab.Fcr + np.arange(cls.NROOTS)) * tab.Prim
+        syn_log = (np.outer(roots, np.arange(cls.N)) % cls.N).astype(np.int32)
+
+        # parity register after one unit symbol, then shifted through zero symbols,
+        # following the reed_solomon_ccsds LFSR; row k is the unit symbol at data position k
+        gen = [int(g) for g in tab.GEN_POLY]
+        def step(p, d):
+            fb = int(tab.INDEX_OF[d ^ p[0]])
+            if fb == cls.N:
+                return p[1:] + [0]
+            q = p[:]
+            for j in range(1, cls.NROOTS):
+                q[j] ^= alpha[(fb + gen[cls.NROOTS - j]) % cls.N]
+            return q[1:] + [alpha[(fb + gen[0]) % cls.N]]
+
+        rows = [step([0] * cls.NROOTS, 1)]
+        for _ in range(cls.K - 1):
+            rows.append(step(rows[-1], 0))
+        par_log = log[np.array(rows[::-1], dtype=np.uint8)]
+
+        cls._EXP, cls._LOG, cls._SYN_LOG, cls._PAR_LOG = exp, log, syn_log, par_log
+
+    @classmethod
+    def syndromes(cls, codeword:Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """
+        Return the 32 syndromes of a (shortened) codeword; all zero means error free.
+        """
+        if cls._EXP is None: cls.build_tables()
+        n = len(codeword)
+        logs = cls._LOG[np.frombuffer(codeword, dtype=np.uint8)]
+        powers = cls._SYN_LOG[:, n - 1::-1] if n else cls._SYN_LOG[:, :0]
+        return np.bitwise_xor.reduce(cls._EXP[powers + logs], axis=1)
+
+    @classmethod
+    def encode(cls, data:Union[bytes, bytearray, memoryview]) -> bytes:
+        """
+        Append 32 parity bytes to up to 223 data bytes (shortened when fewer).
+        """
+        assert len(data) <= cls.K, 'data must be at most 223 bytes'
+        if cls._EXP is None: cls.build_tables()
+        n = len(data)
+        logs = cls._LOG[np.frombuffer(data, dtype=np.uint8)]
+        terms = cls._EXP[cls._PAR_LOG[cls.K - n:] + logs[:, None]]
+        return bytes(data) + np.bitwise_xor.reduce(terms, axis=0).tobytes()
+
+    @classmethod
+    def decode(cls, codeword:Union[bytes, bytearray, memoryview]) -> tuple[int, memoryview]:
+        """
+        Decode a (shortened) codeword of 33..255 bytes.
+
+        Returns:
+            (corrections, data) where data is a view without the parity bytes.
+            Error-free codewords return a view of the input and 0 corrections.
+
+        Raises:
+            rs.UncorrectableError
+        """
+        codeword = memoryview(codeword)
+        n = len(codeword)
+        if not cls.syndromes(codeword).any():
+            return 0, codeword[:n - cls.NROOTS]
+
+        padding = cls.N - n
+        errs, decoded = rs.decode(bytes(padding) + codeword, False, 1)
+        return errs[0], memoryview(decoded)[padding:]
 
 class AX100:
     ASM = b'\x93\x0b\x51\xde'
     
-    def __init__(self, hmac_key:Optional[bytes]=None, crc=False, reed_solomon=False, randomize=True, len_field=True, syncword=True, prefill=32, tailfill=1, exception=False, verbose=False):
-        self.hmac_engine = HMACEngine(hmac_key) if not hmac_key is None else None
-        self.crc_engine = CRCEngine() if crc else None
+    def __init__(self, hmac_key:Optional[bytes]=None, crc=False, reed_solomon=False, randomize=True, len_field=True, syncword=True, prefill=32, tailfill=1, exception=False, verbose=False, packet_profile:Optional[CodecProfile]=None):
+        engines = CodecProfile.get(hmac_key=hmac_key, crc_endian='big' if crc else None)
+        self.hmac_engine = engines.hmac_engine
+        self.crc_engine = engines.crc_engine
+        self.packet_profile = packet_profile or CodecProfile.get()
         self.reed_solomon = reed_solomon
         self.scrambler = CCSDSRxScrambler() if randomize else None
         self.len_field = len_field
@@ -176,7 +355,11 @@ class AX100:
         self.exception = exception
         self.verbose = verbose
 
-    def encode(self, packet:Union[Packet, bytes, bytearray, memoryview]) -> bytes:
+    def body(self, packet:Union[Packet, bytes, bytearray, memoryview]) -> bytes:
+        '''
+        CSP packet with its HMAC/CRC trailers, i.e. the frame contents before RS,
+        scrambling and framing. This is what a receiving AX100 deframer outputs.
+        '''
         if isinstance(packet, Packet):
             x = packet.encode()
         else:
@@ -188,16 +371,13 @@ class AX100:
         if self.crc_engine:
             x = x + self.crc_engine(x)
 
-        if self.reed_solomon:
-            padding = 0
-            if len(x) > 223: 
-                x = x[:223]
-            else:
-                padding = 223 - len(x)
-                x = bytes(padding) + x
+        return x
 
-            coded = rs.encode(x, False, 1)
-            x = coded[padding:]
+    def encode(self, packet:Union[Packet, bytes, bytearray, memoryview], body:Optional[bytes]=None) -> bytes:
+        x = body if body is not None else self.body(packet)
+
+        if self.reed_solomon:
+            x = ReedSolomon.encode(x[:ReedSolomon.K])
 
         if self.scrambler:
             x = self.scrambler(x)
@@ -212,6 +392,12 @@ class AX100:
         return self.prefill*b'\xaa' + x + self.tailfill*b'\xaa'
 
     def decode(self, data:Union[bytes, bytearray, memoryview]) -> Optional[Packet]:
+        '''
+        Decode one frame; the returned packet's payload and raw are bytes and
+        rs_corrections holds the RS correction count.
+        '''
+        corrections = 0
+
         if self.syncword:
             if self.verbose: 
                 if data[0:4] != self.ASM: print('ASM ERROR')
@@ -235,23 +421,14 @@ class AX100:
                 if self.exception: raise ValueError('packet too short')
                 return None
             
-            if len(data) >= 255:
-                padding = 0
-                data = data[:255]
-            else:
-                padding = 255 - len(data)
-                data = bytes(padding) + data
-
             try:
-                errs, decoded = rs.decode(data, False, 1)
-                if self.verbose and errs[0] != 0:
-                    print('RS CORR=%d' % errs[0])
+                corrections, data = ReedSolomon.decode(data[:ReedSolomon.N])
+                if self.verbose and corrections != 0:
+                    print('RS CORR=%d' % corrections)
             except rs.UncorrectableError:
                 if self.verbose: print('RS ERROR')
                 if self.exception: raise ValueError('RS ERROR')
                 return None
-                
-            data = decoded[padding:]
 
         if self.crc_engine:
             crc_val = data[-4:]
@@ -274,17 +451,293 @@ class AX100:
                 if self.exception: raise ValueError('packet too short')
                 return None
                     
-            if hmac_val != self.hmac_engine(data[:-4]):
+            if not self.hmac_engine.verify(data[:-4], hmac_val):
                 if self.verbose: print('HMAC ERROR')
                 if self.exception: raise ValueError('HMAC ERROR')
                 return None
             
             data = data[:-4]
         
-        packet = Packet()
+        packet = Packet(profile=self.packet_profile)
         packet.decode(data)
+        packet.rs_corrections = corrections
         return packet
 
+class LinkProfile:
+    '''
+    AX100 uplink/downlink codec pair of the CTS SAT 1 radio link
+    (see the link layer configuration table in README.md)
+    '''
+    def __init__(self, hmac_key:bytes, verbose:bool=True):
+        self.hmac_key = hmac_key
+        self.uplink = AX100(hmac_key=hmac_key, crc=False, reed_solomon=True,
+                            randomize=True, len_field=True, syncword=True,
+                            prefill=32, tailfill=1)
+        self.downlink = AX100(hmac_key=None, crc=True, reed_solomon=False,
+                              randomize=False, len_field=False, syncword=False,
+                              exception=False, verbose=verbose)
+
+    @classmethod
+    def from_key_file(cls, path:str='hmac_key.txt', verbose:bool=True) -> 'LinkProfile':
+        with open(path, 'r') as f:
+            hmac_key = bytes.fromhex(f.read().strip())
+        return cls(hmac_key, verbose=verbose)
+
+    def __reduce__(self):
+        # rebuilt from the key in CodecPool worker processes
+        return (self.__class__, (self.hmac_key, self.downlink.verbose))
+
+# LinkProfile of a CodecPool worker process, set by _pool_init
+_pool_link:Optional[LinkProfile] = None
+
+def _pool_init(link:LinkProfile):
+    global _pool_link
+    _pool_link = link
+
+def _pool_decode(link:Optional[LinkProfile], rx:bytes) -> Optional[tuple[bytes, int]]:
+    try:
+        packet = (link or _pool_link).downlink.decode(rx)
+    except ValueError as e:
+        print(e)
+        return None
+    if not packet:
+        return None
+    return bytes(packet.raw), packet.rs_corrections
+
+def _pool_encode(link:Optional[LinkProfile], body:bytes) -> bytes:
+    return (link or _pool_link).uplink.encode(b'', body)
+
+class CodecPool:
+    '''
+    Runs the AX100 codecs of a LinkProfile off the asyncio event loop.
+
+    kind None codes inline on the loop, 'thread' uses a thread pool (only helps
+    where the codec releases the GIL, e.g. hashing of large frames) and
+    'process' a process pool, whose workers rebuild the LinkProfile from its key.
+    decode() results are (CSP header + payload, RS corrections) or None, so they
+    can cross a process boundary; decode_ordered() yields them in arrival order.
+    '''
+    def __init__(self, link:LinkProfile, kind:Optional[str]=None, workers:int=2):
+        assert kind in (None, 'thread', 'process'), 'unknown executor kind'
+        self.link = link
+        self.kind = kind
+        self.workers = workers
+        self.executor:Optional[Executor] = None
+        if kind == 'thread':
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='codec')
+        elif kind == 'process':
+            self.executor = ProcessPoolExecutor(workers, initializer=_pool_init, initargs=(link,))
+
+    def _run(self, fn, data) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            fut = loop.create_future()
+            fut.set_result(fn(self.link, data))
+            return fut
+        # worker processes use their own copy of the link
+        link = None if self.kind == 'process' else self.link
+        return loop.run_in_executor(self.executor, fn, link, bytes(data))
+
+    def decode(self, rx:Union[bytes, bytearray, memoryview]) -> asyncio.Future:
+        return self._run(_pool_decode, rx)
+
+    def encode(self, body:bytes) -> asyncio.Future:
+        '''
+        Frame a body from AX100.body for the uplink
+        '''
+        return self._run(_pool_encode, body)
+
+    async def decode_ordered(self, frames:AsyncIterator[bytes], depth:Optional[int]=None) -> AsyncIterator[Optional[tuple[bytes, int]]]:
+        '''
+        Decode an async stream of frames with up to `depth` frames in flight,
+        yielding the results in the order the frames arrived.
+        '''
+        pending:asyncio.Queue = asyncio.Queue(depth or 4 * self.workers)
+
+        async def feed():
+            try:
+                async for rx in frames:
+                    await pending.put(self.decode(rx))
+            except Exception as e:
+                # hand the error to the consumer after the frames before it
+                failed = asyncio.get_running_loop().create_future()
+                failed.set_exception(e)
+                await pending.put(failed)
+            else:
+                await pending.put(None)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while (fut := await pending.get()) is not None:
+                yield await fut
+        finally:
+            feeder.cancel()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+class EchoFilter:
+    '''
+    Recognizes our own transmissions coming back from the receiver. The uplink
+    registers a short hash of each frame body (AX100.body) with add(); is_echo()
+    is then one hash and one dict lookup per received frame. Fingerprints are
+    matched for `ttl` seconds and kept for a further `grace` seconds, during
+    which a match still suppresses the frame but is counted as a late echo.
+    '''
+    def __init__(self, ttl:float=10.0, grace:float=60.0, hmac_engine=None):
+        '''
+        hmac_engine: optional uplink HMACEngine used to recognize echoes of frames
+        sent by another process (nothing registered here); such frames carry a
+        valid uplink HMAC trailer, which downlink frames never do.
+        '''
+        self.ttl = ttl
+        self.grace = grace
+        self.hmac_engine = hmac_engine
+        self._seen:OrderedDict[bytes, float] = OrderedDict()   # fingerprint -> time sent
+        self.suppressed = 0
+        self.late = 0
+
+    @staticmethod
+    def fingerprint(data:Union[bytes, bytearray, memoryview]) -> bytes:
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+    def _expire(self, now:float):
+        limit = now - self.ttl - self.grace
+        seen = self._seen
+        while seen:
+            fp, t = next(iter(seen.items()))
+            if t >= limit:
+                break
+            del seen[fp]
+
+    def add(self, body:Union[bytes, bytearray, memoryview]):
+        now = time.monotonic()
+        fp = self.fingerprint(body)
+        self._seen[fp] = now
+        self._seen.move_to_end(fp)
+        self._expire(now)
+
+    def is_echo(self, rx:Union[bytes, bytearray, memoryview]) -> bool:
+        t = self._seen.get(self.fingerprint(rx))
+        if t is not None:
+            now = time.monotonic()
+            if now - t > self.ttl:
+                self.late += 1
+            self._expire(now)
+            self.suppressed += 1
+            return True
+
+        if self.hmac_engine and len(rx) > self.hmac_engine.TAGSIZE:
+            rx = memoryview(rx)
+            if self.hmac_engine.verify(rx[:-self.hmac_engine.TAGSIZE], rx[-self.hmac_engine.TAGSIZE:]):
+                self.suppressed += 1
+                return True
+
+        return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+class AX100Deframer:
+    '''
+    Incremental AX100 deframer for an arbitrary byte stream (coalesced or split reads).
+    Frames are ASM (4B) + Golay24 length (3B) + `length` bytes, returned including the
+    ASM so they can be passed straight to AX100.decode. The search resumes where the
+    previous push() stopped, so consumed bytes are never rescanned.
+    Not used by the receive paths: the GRC socket_pdu output (GrcReceiver, the
+    gateway) is already deframed and carries no ASM, so a TCP read there that
+    coalesces two PDUs is still decoded as one frame. This is for raw framed
+    streams, e.g. a recording of the demodulated bit stream.
+    '''
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def __init__(self, asm:bytes=b'\x93\x0b\x51\xde', asm_errors:int=0, max_len:int=4095):
+        '''
+        :param asm_errors: number of bit errors tolerated in the ASM
+        :param max_len: largest frame body accepted; longer lengths are treated as false syncs
+        '''
+        self.asm = asm
+        self.asm_errors = asm_errors
+        self.max_len = max_len
+        self._asm_arr = np.frombuffer(asm, dtype=np.uint8)
+        self._buf = bytearray()
+        self._scan = 0      # offset in _buf where the next ASM search starts
+        self.frames = 0
+        self.false_syncs = 0
+
+    def _fuzzy_hits(self, start:int) -> np.ndarray:
+        '''
+        Offsets from `start` on where the ASM matches within asm_errors bit errors
+        '''
+        buf = self._buf
+        if len(buf) - start < len(self.asm):
+            return np.zeros(0, dtype=np.intp)
+        arr = np.frombuffer(buf, dtype=np.uint8)[start:]
+        win = np.lib.stride_tricks.sliding_window_view(arr, len(self.asm))
+        dist = self._POPCOUNT[win ^ self._asm_arr].sum(axis=1, dtype=np.int32)
+        del arr, win   # release the buffer export so _buf can be resized
+        return start + np.flatnonzero(dist <= self.asm_errors)
+
+    def push(self, data:Union[bytes, bytearray, memoryview]) -> list[bytes]:
+        '''
+        Append received bytes and return every frame completed by them.
+        '''
+        buf = self._buf
+        buf += data
+        out = []
+        hits = None    # fuzzy ASM offsets, computed once per push
+
+        while True:
+            if not self.asm_errors:
+                start = buf.find(self.asm, self._scan)
+            else:
+                if hits is None:
+                    hits = self._fuzzy_hits(self._scan)
+                i = int(np.searchsorted(hits, self._scan))
+                start = int(hits[i]) if i < len(hits) else -1
+
+            if start < 0:
+                # keep only a possible partial ASM at the end
+                self._scan = max(self._scan, len(buf) - len(self.asm) + 1)
+                break
+
+            hdr_end = start + len(self.asm) + 3
+            if len(buf) < hdr_end:
+                self._scan = start
+                break
+
+            length, errcnt = Golay24.decode(int.from_bytes(buf[hdr_end - 3:hdr_end], 'big'))
+            length &= 0xfff
+            if errcnt < 0 or length > self.max_len:
+                self.false_syncs += 1
+                self._scan = start + 1
+                continue
+
+            end = hdr_end + length
+            if len(buf) < end:
+                self._scan = start
+                break
+
+            out.append(bytes(buf[start:end]))
+            self.frames += 1
+            self._scan = end
+
+        del buf[:self._scan]
+        self._scan = 0
+        return out
+
+    async def stream(self, link:'GrcLink') -> AsyncIterator[bytes]:
+        '''
+        Yield complete frames read from link until it is closed.
+        '''
+        while True:
+            data = await link.recv()
+            if not data:
+                return
+            for frame in self.push(data):
+                yield frame
+
 class KISS:
     def __init__(self):
         pass
@@ -307,9 +760,92 @@ class GrcLink:
     async def recv(self) -> bytes:
         return await self.reader.read(self.mtu)
 
+    def frames(self, deframer:Optional[AX100Deframer]=None) -> AsyncIterator[bytes]:
+        '''
+        Async iterator of complete AX100 frames for links carrying a raw framed
+        stream (ASM + Golay length). Not applicable to the socket_pdu port,
+        which carries deframed PDUs.
+        '''
+        return (deframer or AX100Deframer()).stream(self)
+
     def close(self):
         self.writer.close()
         
+class GrcReceiver:
+    '''
+    Long-lived GNU Radio receiver: holds one GrcLink connection, reconnects
+    with exponential backoff when it drops or cannot be made, and hands every
+    decoded packet to each sink. A sink is a callable taking the packet; if it
+    returns an awaitable, that is awaited before the next frame. A sink that
+    raises is reported and counted in sink_errors; the other sinks and the
+    connection carry on.
+    '''
+    def __init__(self, sinks:list, decode=None, echo_filter:Optional['EchoFilter']=None,
+                 addr:str='127.0.0.1', port:int=52001, backoff:tuple[float, float]=(0.5, 30.0)):
+        '''
+        decode: frame -> Packet or None, e.g. LinkProfile.downlink.decode;
+                None passes raw frames to the sinks
+        '''
+        self.sinks = sinks
+        self.decode = decode
+        self.echo_filter = echo_filter
+        self.addr = addr
+        self.port = port
+        self.backoff = backoff
+        self.link:Optional[GrcLink] = None
+        self.frames = 0
+        self.rejected = 0      # echoes and frames that failed to decode
+        self.connects = 0
+        self.sink_errors = 0
+
+    async def run(self):
+        delay = self.backoff[0]
+        while True:
+            try:
+                self.link = await GrcLink.connect(self.addr, self.port)
+            except OSError as e:
+                print('GRC %s:%d unavailable (%s), retry in %.1fs' % (self.addr, self.port, e, delay))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff[1])
+                continue
+
+            delay = self.backoff[0]
+            self.connects += 1
+            print('GRC %s:%d connected' % (self.addr, self.port))
+            try:
+                # one read is taken as one PDU; socket_pdu PDUs carry no
+                # length or ASM, so reads that coalesce PDUs are not split
+                while rx := await self.link.recv():
+                    await self._deliver(rx)
+            except OSError:
+                pass
+            finally:
+                self.link.close()
+                self.link = None
+            print('GRC %s:%d connection lost' % (self.addr, self.port))
+
+    async def _deliver(self, rx:bytes):
+        self.frames += 1
+        if self.echo_filter and self.echo_filter.is_echo(rx):
+            self.rejected += 1
+            return
+        try:
+            packet = self.decode(rx) if self.decode else rx
+        except ValueError as e:
+            print(e)
+            packet = None
+        if not packet:
+            self.rejected += 1
+            return
+        for sink in self.sinks:
+            try:
+                result = sink(packet)
+                if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                    await result
+            except Exception as e:
+                self.sink_errors += 1
+                print('sink %r failed: %r' % (sink, e))
+
 class Interface:
     def __init__(self, name='', mtu=256, timeout=1):
         self.mtu = mtu